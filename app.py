@@ -1,32 +1,90 @@
 import os
-from flask import Flask
+import importlib
+from flask import Flask, request
+from werkzeug.middleware.proxy_fix import ProxyFix
 from mongoengine import connect
 from dotenv import load_dotenv
-from flask_cors import CORS
-from routes.college_admin import collegeadmin_bp
-from routes.student_routes import bp
-from routes.test_mail import test_mail
-from routes.test.tests import test_bp
-from routes.test.section import test_bp as section_bp
-from routes.test.questions.mcq import mcq_bp as test_mcq_bp
 # Load environment variables
 load_dotenv()
 
-def create_app():
+# routes.<module> -> blueprint attribute; modules are imported only when the app is built
+BLUEPRINTS = {
+    "college_admin": "collegeadmin_bp",
+    "student_routes": "bp",
+    "test_mail": "test_mail",
+    "test.tests": "test_bp",
+    "test.section": "test_bp",
+    "test.questions.mcq": "mcq_bp",
+}
+
+_db_connected = False
+
+
+def connect_db():
+    """
+    Register the default MongoDB connection once per process. Repeated create_app()
+    calls (tests, warm serverless invocations) reuse the same MongoClient and pool.
+    connect=False defers the first socket to the first query, so preforked workers
+    don't inherit a client opened in the master.
+    """
+    global _db_connected
+    if _db_connected:
+        return
+    # MongoDB Atlas with a bounded per-worker connection pool
+    connect(
+        host=os.getenv("MONGO_URI"),
+        maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+        maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "30000")),
+        waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        connect=False,
+    )
+    _db_connected = True
+
+
+def create_app(blueprints=None):
+    """
+    Build the Flask app. `blueprints` limits registration (and imports) to the
+    given routes modules, e.g. create_app(blueprints=("college_admin",)).
+    """
     app = Flask(__name__)
+    # behind a reverse proxy, set PROXY_FIX_X_FOR to the number of trusted proxies so
+    # request.remote_addr (per-client auth throttling in token_required) is the client from
+    # X-Forwarded-For. Off by default: without a proxy that header is client-supplied
+    x_for = int(os.getenv("PROXY_FIX_X_FOR", "0"))
+    if x_for:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=x_for)
 
     # Flask config
-    CORS(app, resources={r"/*": {"origins": "*"}})
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "fallback-secret")
+    # list_mcqs: skip count()/total_pages and page by has_next/next_cursor only
+    app.config["OPTIMIZE_PAGINATION_FOR_SPEED"] = os.getenv("MCQ_PAGINATION_FAST") == "1"
+
+    connect_db()
+    for name in (blueprints or BLUEPRINTS):
+        module = importlib.import_module(f"routes.{name}")
+        app.register_blueprint(getattr(module, BLUEPRINTS[name]))
+
+    # CORS: allow any origin. A fixed header set per response instead of flask-cors' per-request resource matching.
+    @app.before_request
+    def _cors_preflight():
+        if request.method == "OPTIONS":
+            return "", 204
+
+    @app.after_request
+    def _cors(resp):
+        resp.headers["Access-Control-Allow-Origin"] = "*"
+        if request.method == "OPTIONS":
+            # echo what the browser asked for: "*" does not cover the Authorization header
+            resp.headers["Access-Control-Allow-Methods"] = request.headers.get(
+                "Access-Control-Request-Method", "GET, POST, PUT, PATCH, DELETE, OPTIONS"
+            )
+            resp.headers["Access-Control-Allow-Headers"] = request.headers.get(
+                "Access-Control-Request-Headers", "Authorization, Content-Type"
+            )
+        return resp
 
-    # Connect to MongoDB Atlas
-    connect(host=os.getenv("MONGO_URI"))
-    app.register_blueprint(collegeadmin_bp)
-    app.register_blueprint(bp)
-    app.register_blueprint(test_mail)
-    app.register_blueprint(test_bp)
-    app.register_blueprint(section_bp)
-    app.register_blueprint(test_mcq_bp)
     @app.route("/")
     def home():
         return {"message": "CP Admin API is running 🚀"}
@@ -36,4 +94,3 @@ def create_app():
 if __name__ == "__main__":
     app = create_app()
     app.run(debug=True, port=8000)  # <-- change port here
-
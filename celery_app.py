@@ -1,17 +1,60 @@
 import os
-from celery import Celery
+import functools
 from dotenv import load_dotenv
 
 load_dotenv()
 
-celery = Celery("deloai")
+# In dev → run tasks immediately, no Redis (and no celery/kombu import at all)
+EAGER = os.getenv("FLASK_ENV") == "development"
+
+
+class _EagerTask:
+    """Dev-mode task: .delay()/.apply_async() call the function inline."""
+
+    class MaxRetriesExceededError(Exception):
+        pass
+
+    def __init__(self, fn, name=None, bind=False, max_retries=3, **options):
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.name = name or fn.__name__
+        self.bind = bind
+        self.max_retries = max_retries
+
+    def __call__(self, *args, **kwargs):
+        if self.bind:
+            return self.fn(self, *args, **kwargs)
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self(*args, **kwargs)
+
+    def apply_async(self, args=(), kwargs=None, **options):
+        return self(*args, **(kwargs or {}))
+
+    def retry(self, exc=None, **options):
+        """No broker to reschedule on: fail fast (same as task_eager_propagates)."""
+        raise exc if exc is not None else self.MaxRetriesExceededError()
+
+
+class _EagerCelery:
+    """Stand-in for the Celery app in development; only supports @task."""
+
+    def task(self, *args, **options):
+        if args and callable(args[0]):
+            return _EagerTask(args[0])
+        return lambda fn: _EagerTask(fn, **options)
+
+
+def _make_celery():
+    if EAGER:
+        return _EagerCelery()
 
-if os.getenv("FLASK_ENV") == "development":
-    # In dev → run tasks immediately, no Redis
-    celery.conf.update(task_always_eager=True, task_eager_propagates=True)
-else:
     # In prod → use Redis
-    celery.conf.update(
+    from celery import Celery
+
+    app = Celery("deloai")
+    app.conf.update(
         broker_url=os.getenv("CELERY_BROKER_URL"),
         result_backend=os.getenv("CELERY_RESULT_BACKEND"),
         task_serializer="json",
@@ -19,3 +62,13 @@ else:
         accept_content=["json"],
         timezone="Asia/Kolkata",
     )
+    return app
+
+
+def __getattr__(name):
+    # `celery` is built on first access (e.g. `from celery_app import celery`)
+    if name == "celery":
+        app = _make_celery()
+        globals()["celery"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,35 @@
+# migrate_indexes.py
+# One-shot migration: drop indexes superseded by the compound/partial indexes declared in model meta.
+# mongoengine only creates missing indexes, it never removes old ones.
+# Usage: MONGO_URI=... python migrate_indexes.py   (safe to re-run; missing indexes are skipped)
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+OBSOLETE = {
+    # start/end: replaced by (start_datetime, end_datetime), (start_datetime, id), (end_datetime, id);
+    # test_name: search goes through the $text index and the test_name_lc prefix index
+    "tests": ["start_datetime_1", "end_datetime_1", "test_name_1"],
+    # sparse unique -> *_partial_unique; drop before the app builds the new ones
+    "students": ["usn_1", "enrollment_number_1"],
+    # no query filters on allowed_languages; the multikey index was pure write cost
+    "questions": ["allowed_languages_1"],
+    # replaced by (time_restricted, name)
+    "sections": ["time_restricted_1", "name_1"],
+}
+
+
+def migrate(db):
+    for collection, names in OBSOLETE.items():
+        existing = {idx["name"] for idx in db[collection].list_indexes()}
+        for name in names:
+            if name in existing:
+                db[collection].drop_index(name)
+                print(collection, "dropped:", name)
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    migrate(client.get_default_database())
@@ -0,0 +1,23 @@
+# migrate_mcq_search.py
+# One-shot migration: backfill the lowercase search shadow (title_lc) on existing MCQs.
+# Usage: MONGO_URI=... python migrate_mcq_search.py   (safe to re-run; recomputes from title)
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+
+def migrate(db):
+    shadow = {
+        # non-string / missing title -> shadow removed
+        "title_lc": {"$cond": [{"$eq": [{"$type": "$title"}, "string"]}, {"$toLower": "$title"}, "$$REMOVE"]}
+    }
+    # update-with-pipeline (MongoDB 4.2+): computed server-side in one command
+    result = db.mcqs.update_many({}, [{"$set": shadow}])
+    print("mcqs updated:", result.modified_count)
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    migrate(client.get_default_database())
@@ -0,0 +1,30 @@
+# migrate_section_questions.py
+# One-shot migration: SectionQuestion {mcq_ref, coding_ref, rearrange_ref} -> {question_id} (type tag kept).
+# Usage: MONGO_URI=... python migrate_section_questions.py   (safe to re-run; migrated sections are skipped)
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+REFS = ["mcq_ref", "coding_ref", "rearrange_ref"]
+
+
+def migrate(db):
+    # first non-null of the three refs
+    question_id = {"$ifNull": ["$$q.mcq_ref", {"$ifNull": ["$$q.coding_ref", "$$q.rearrange_ref"]}]}
+    # update-with-pipeline (MongoDB 4.2+): rewrite every entry server-side in one command
+    result = db.sections.update_many(
+        {"$or": [{f"questions.{r}": {"$exists": True}} for r in REFS]},
+        [{"$set": {"questions": {"$map": {
+            "input": "$questions",
+            "as": "q",
+            "in": {"question_type": "$$q.question_type", "question_id": question_id},
+        }}}}],
+    )
+    print("sections migrated:", result.modified_count)
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    migrate(client.get_default_database())
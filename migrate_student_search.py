@@ -0,0 +1,26 @@
+# migrate_student_search.py
+# One-shot migration: backfill the lowercase search shadows (<field>_lc) on existing students.
+# Usage: MONGO_URI=... python migrate_student_search.py   (safe to re-run; recomputes from the source fields)
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+SEARCH_FIELDS = ["name", "email", "usn", "enrollment_number"]
+
+
+def migrate(db):
+    shadows = {
+        # non-string / missing source -> shadow removed
+        f"{f}_lc": {"$cond": [{"$eq": [{"$type": f"${f}"}, "string"]}, {"$toLower": f"${f}"}, "$$REMOVE"]}
+        for f in SEARCH_FIELDS
+    }
+    # update-with-pipeline (MongoDB 4.2+): computed server-side in one command
+    result = db.students.update_many({}, [{"$set": shadows}])
+    print("students updated:", result.modified_count)
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    migrate(client.get_default_database())
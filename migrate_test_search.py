@@ -0,0 +1,23 @@
+# migrate_test_search.py
+# One-shot migration: backfill the lowercase search shadow (test_name_lc) on existing tests.
+# Usage: MONGO_URI=... python migrate_test_search.py   (safe to re-run; recomputes from test_name)
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+
+def migrate(db):
+    shadow = {
+        # non-string / missing test_name -> shadow removed
+        "test_name_lc": {"$cond": [{"$eq": [{"$type": "$test_name"}, "string"]}, {"$toLower": "$test_name"}, "$$REMOVE"]}
+    }
+    # update-with-pipeline (MongoDB 4.2+): computed server-side in one command
+    result = db.tests.update_many({}, [{"$set": shadow}])
+    print("tests updated:", result.modified_count)
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    migrate(client.get_default_database())
@@ -0,0 +1,32 @@
+# migrate_token_buckets.py
+# One-shot migration: embedded TokenStatus {count, status} -> flat <bucket>_count / <bucket>_status fields.
+# Usage: MONGO_URI=... python migrate_token_buckets.py   (safe to re-run; migrated docs are skipped)
+import os
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+BUCKETS = {
+    "token_log": ["number_of_tokens", "consumed_tokens", "pending_initiation", "unused_tokens"],
+    "token_config": ["total_tokens", "consumed_tokens", "pending_tokens", "unused_tokens"],
+}
+
+
+def migrate(db):
+    for collection, buckets in BUCKETS.items():
+        flatten = {}
+        for b in buckets:
+            flatten[f"{b}_count"] = {"$ifNull": [f"${b}.count", 0]}
+            flatten[f"{b}_status"] = {"$ifNull": [f"${b}.status", "active"]}
+        # update-with-pipeline (MongoDB 4.2+): convert server-side in one command per collection
+        result = db[collection].update_many(
+            {"$or": [{b: {"$type": "object"}} for b in buckets]},
+            [{"$set": flatten}, {"$unset": buckets}],
+        )
+        print(collection, "migrated:", result.modified_count)
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    migrate(client.get_default_database())
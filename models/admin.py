@@ -1,9 +1,10 @@
 # models/admin.py
 from mongoengine import Document, StringField, EmailField, DateTimeField, BooleanField, DictField
 from datetime import datetime
+from models.mixins import TimestampedMixin
 
 
-class Admin(Document):
+class Admin(TimestampedMixin, Document):
     """
     Admin model for user management in the system.
     """
@@ -24,9 +25,12 @@ class Admin(Document):
 
     def save(self, *args, **kwargs):
         """Override save to update timestamp."""
+        if self._save_timestamp_only(**kwargs):
+            return self
+        now = datetime.utcnow()
         if not self.created_at:
-            self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+            self.created_at = now
+        self.updated_at = now
         return super(Admin, self).save(*args, **kwargs)
 
     def to_json(self):
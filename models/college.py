@@ -2,10 +2,13 @@
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, BooleanField, ReferenceField,
-    EmbeddedDocumentField, ListField, EmailField,IntField,DateTimeField
+    EmbeddedDocumentField, ListField, EmailField,IntField,DateTimeField,
+    ObjectIdField, DictField
 )
+from mongoengine.context_managers import no_dereference
 
 
+from collections import namedtuple
 from datetime import datetime
 
 
@@ -68,6 +71,34 @@ class CollegeAdmin(Document):
             "is_first_login": self.is_first_login
         }
 
+    @staticmethod
+    def serialize_raw(doc):
+        """Same shape as to_json(), built from a raw pymongo dict."""
+        return {
+            "id": str(doc["_id"]),
+            "name": doc.get("name"),
+            "email": doc.get("email"),
+            "designation": doc.get("designation"),
+            "status": doc.get("status", "active"),
+            "phone": doc.get("phone"),
+            "is_first_login": doc.get("is_first_login", True)
+        }
+
+
+def _ref_ids(refs):
+    """ObjectIds of a reference id list; also accepts legacy DBRefs or documents."""
+    return [getattr(r, "id", r) for r in (refs or [])]
+
+
+def _fetch_raw(doc_cls, ids, *fields):
+    """Fetch raw documents for `ids` in a single query, keyed by _id."""
+    if not ids:
+        return {}
+    qs = doc_cls.objects(id__in=list(ids))
+    if fields:
+        qs = qs.only(*fields)
+    return {d["_id"]: d for d in qs.as_pymongo()}
+
 # College document
 class College(Document):
     name = StringField(required=True)
@@ -76,14 +107,25 @@ class College(Document):
     notes = StringField()
     status = StringField(default="active")
     contacts = ListField(EmbeddedDocumentField(Contact))
-    admins = ListField(ReferenceField(CollegeAdmin))
-    token_logs = ListField(ReferenceField('TokenLog'))  # <- Added this
+    # stored as plain ObjectIds (same BSON as a non-dbref ReferenceField); resolve via get_admins/get_token_logs
+    admins = ListField(ObjectIdField())
+    token_logs = ListField(ObjectIdField())  # <- Added this
     token = ReferenceField('TokenConfig')  # <- Added this
-        
-
 
+    meta = {
+        # multikey: admin -> college lookup at login / has_admin
+        "indexes": ["admins"],
+    }
 
     def to_json(self):
+        # fetch each referenced collection once as raw dicts
+        admin_ids = _ref_ids(self.admins)
+        log_ids = _ref_ids(self.token_logs)
+
+        admins = _fetch_raw(CollegeAdmin, admin_ids)
+        logs = _fetch_raw(TokenLog, log_ids)
+        assigned_by = _fetch_raw(Admin, {l.get("assigned_by") for l in logs.values()} - {None}, "name", "email")
+
         return {
             "id": str(self.id),
             "name": self.name,
@@ -92,61 +134,182 @@ class College(Document):
             "notes": self.notes,
             "status": self.status,
             "contacts": [c.to_json() for c in self.contacts],
-            "admins": [admin.to_json() for admin in self.admins],
-            "token_logs": [log.to_json() for log in self.token_logs]  # <- Added
+            "admins": [CollegeAdmin.serialize_raw(admins[i]) for i in admin_ids if i in admins],
+            "token_logs": [
+                TokenLog.serialize_raw(logs[i], assigned_by.get(logs[i].get("assigned_by")))
+                for i in log_ids if i in logs
+            ]  # <- Added
 
         }
 
+    # Membership checks go to the server; avoid `x in college.admins` on loaded documents.
+    def has_admin(self, admin_id):
+        """True if `admin_id` is in this college's admins (single indexed query, nothing hydrated)."""
+        return College.objects(id=self.id, admins=_ref_ids([admin_id])[0]).only("id").first() is not None
+
+    def has_token_log(self, log_id):
+        """True if `log_id` is in this college's token_logs (single query, nothing hydrated)."""
+        return College.objects(id=self.id, token_logs=_ref_ids([log_id])[0]).only("id").first() is not None
+
+    def get_admins(self):
+        """CollegeAdmin documents for `admins`, fetched in one query (stored order kept)."""
+        ids = _ref_ids(self.admins)
+        found = CollegeAdmin.objects.in_bulk(ids)
+        return [found[i] for i in ids if i in found]
+
+    def get_token_logs(self):
+        """TokenLog documents for `token_logs`, fetched in one query (stored order kept)."""
+        ids = _ref_ids(self.token_logs)
+        found = TokenLog.objects.in_bulk(ids)
+        return [found[i] for i in ids if i in found]
+
 from models.admin import Admin  # Import Admin model for ReferenceField
-# Embedded document for token status
-class TokenStatus(EmbeddedDocument):
-    count = IntField(default=0)
-    status = StringField(default="active")  
+# Token bucket value (previously an embedded TokenStatus document)
+TokensView = namedtuple("TokensView", ["count", "status"])
+
+
+class TokenBucket:
+    """
+    Exposes the flat `<name>_count` / `<name>_status` fields as a TokensView,
+    so `log.unused_tokens.count` keeps working. Documents not yet migrated
+    (no `<name>_count`) are read from the legacy embedded `<name>_legacy`
+    dict instead. Accepts a TokensView or a {"count", "status"} dict on
+    assignment; assigning drops the legacy copy.
+    """
+
+    def __set_name__(self, owner, name):
+        self.count_field = f"{name}_count"
+        self.status_field = f"{name}_status"
+        self.legacy_field = f"{name}_legacy"
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        count = getattr(obj, self.count_field)
+        if count is None:
+            legacy = getattr(obj, self.legacy_field) or {}
+            return TokensView(legacy.get("count", 0), legacy.get("status", "active"))
+        return TokensView(count, getattr(obj, self.status_field) or "active")
 
-class TokenLog(Document):
+    def __set__(self, obj, value):
+        if isinstance(value, dict):
+            value = TokensView(value.get("count", 0), value.get("status", "active"))
+        setattr(obj, self.count_field, value.count)
+        setattr(obj, self.status_field, value.status)
+        setattr(obj, self.legacy_field, None)
+
+
+class TokenBucketsMixin:
+    """Lets bucket names be passed to the constructor, e.g. TokenLog(number_of_tokens={"count": 5})."""
+
+    def __init__(self, *args, **values):
+        buckets = {k: values.pop(k) for k in list(values) if isinstance(getattr(type(self), k, None), TokenBucket)}
+        super().__init__(*args, **values)
+        for name, value in buckets.items():
+            setattr(self, name, value)
+
+
+def _raw_bucket(doc, name):
+    """{"count", "status"} for a bucket from a raw dict (flat fields, or the legacy embedded shape)."""
+    if f"{name}_count" in doc:
+        return {"count": doc[f"{name}_count"], "status": doc.get(f"{name}_status", "active")}
+    legacy = doc.get(name) or {}
+    return {"count": legacy.get("count", 0), "status": legacy.get("status", "active")}
+
+
+class TokenLog(TokenBucketsMixin, Document):
     assigned_date = DateTimeField(default=datetime.utcnow)
-    number_of_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)
     assigned_by = ReferenceField(Admin, required=True)
-    consumed_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)
-    pending_initiation = EmbeddedDocumentField(TokenStatus, default=TokenStatus)
-    unused_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)  # <- New field
     notes = StringField()
 
+    # token buckets stored as flat count/status pairs (count unset -> read the legacy embedded shape)
+    number_of_tokens_count = IntField()
+    number_of_tokens_status = StringField(default="active")
+    consumed_tokens_count = IntField()
+    consumed_tokens_status = StringField(default="active")
+    pending_initiation_count = IntField()
+    pending_initiation_status = StringField(default="active")
+    unused_tokens_count = IntField()  # <- New field
+    unused_tokens_status = StringField(default="active")
+
+    # pre-migration {count, status} documents (see migrate_token_buckets.py)
+    number_of_tokens_legacy = DictField(db_field="number_of_tokens")
+    consumed_tokens_legacy = DictField(db_field="consumed_tokens")
+    pending_initiation_legacy = DictField(db_field="pending_initiation")
+    unused_tokens_legacy = DictField(db_field="unused_tokens")
+
+    number_of_tokens = TokenBucket()
+    consumed_tokens = TokenBucket()
+    pending_initiation = TokenBucket()
+    unused_tokens = TokenBucket()
+
     def to_json(self):
+        # only id/name/email of assigned_by are needed: fetch them projected instead of dereferencing
+        with no_dereference(TokenLog):
+            admin_id = getattr(self.assigned_by, "id", self.assigned_by)
+        assigned_by = _fetch_raw(Admin, [admin_id], "name", "email").get(admin_id) if admin_id else None
+
         return {
             "id": str(self.id),
             "assigned_date": self.assigned_date.isoformat(),
-            "number_of_tokens": {
-                "count": self.number_of_tokens.count,
-                "status": self.number_of_tokens.status
-            },
+            "number_of_tokens": self.number_of_tokens._asdict(),
             "assigned_by": {
-                "id": str(self.assigned_by.id),
-                "name": self.assigned_by.name,
-                "email": self.assigned_by.email
-            } if self.assigned_by else None,
-            "consumed_tokens": {
-                "count": self.consumed_tokens.count,
-                "status": self.consumed_tokens.status
-            },
-            "pending_initiation": {
-                "count": self.pending_initiation.count,
-                "status": self.pending_initiation.status
-            },
-            "unused_tokens": {  # <- Added to JSON
-                "count": self.unused_tokens.count,
-                "status": self.unused_tokens.status
-            },
+                "id": str(assigned_by["_id"]),
+                "name": assigned_by.get("name"),
+                "email": assigned_by.get("email")
+            } if assigned_by else None,
+            "consumed_tokens": self.consumed_tokens._asdict(),
+            "pending_initiation": self.pending_initiation._asdict(),
+            "unused_tokens": self.unused_tokens._asdict(),  # <- Added to JSON
             "notes": self.notes
         }
 
+    @staticmethod
+    def serialize_raw(doc, assigned_by=None):
+        """
+        Same shape as to_json(), built from a raw pymongo dict.
+        `assigned_by` is the raw Admin dict (only name/email are needed).
+        """
+        assigned_date = doc.get("assigned_date")
+        return {
+            "id": str(doc["_id"]),
+            "assigned_date": assigned_date.isoformat() if assigned_date else None,
+            "number_of_tokens": _raw_bucket(doc, "number_of_tokens"),
+            "assigned_by": {
+                "id": str(assigned_by["_id"]),
+                "name": assigned_by.get("name"),
+                "email": assigned_by.get("email")
+            } if assigned_by else None,
+            "consumed_tokens": _raw_bucket(doc, "consumed_tokens"),
+            "pending_initiation": _raw_bucket(doc, "pending_initiation"),
+            "unused_tokens": _raw_bucket(doc, "unused_tokens"),
+            "notes": doc.get("notes")
+        }
+
 # Token Configuration per College
-class TokenConfig(Document):
+class TokenConfig(TokenBucketsMixin, Document):
     college = ReferenceField(College, required=True, unique=True)  # One config per college
-    total_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)
-    consumed_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)
-    pending_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)
-    unused_tokens = EmbeddedDocumentField(TokenStatus, default=TokenStatus)  # <- New field
+
+    # token buckets stored as flat count/status pairs (count unset -> read the legacy embedded shape)
+    total_tokens_count = IntField()
+    total_tokens_status = StringField(default="active")
+    consumed_tokens_count = IntField()
+    consumed_tokens_status = StringField(default="active")
+    pending_tokens_count = IntField()
+    pending_tokens_status = StringField(default="active")
+    unused_tokens_count = IntField()  # <- New field
+    unused_tokens_status = StringField(default="active")
+
+    # pre-migration {count, status} documents (see migrate_token_buckets.py)
+    total_tokens_legacy = DictField(db_field="total_tokens")
+    consumed_tokens_legacy = DictField(db_field="consumed_tokens")
+    pending_tokens_legacy = DictField(db_field="pending_tokens")
+    unused_tokens_legacy = DictField(db_field="unused_tokens")
+
+    total_tokens = TokenBucket()
+    consumed_tokens = TokenBucket()
+    pending_tokens = TokenBucket()
+    unused_tokens = TokenBucket()
 
     def to_json(self):
         return {
@@ -155,20 +318,8 @@ class TokenConfig(Document):
                 "id": str(self.college.id),
                 "name": self.college.name
             } if self.college else None,
-            "total_tokens": {
-                "count": self.total_tokens.count,
-                "status": self.total_tokens.status
-            },
-            "consumed_tokens": {
-                "count": self.consumed_tokens.count,
-                "status": self.consumed_tokens.status
-            },
-            "pending_tokens": {
-                "count": self.pending_tokens.count,
-                "status": self.pending_tokens.status
-            },
-            "unused_tokens": {  # <- Added to JSON
-                "count": self.unused_tokens.count,
-                "status": self.unused_tokens.status
-            }
+            "total_tokens": self.total_tokens._asdict(),
+            "consumed_tokens": self.consumed_tokens._asdict(),
+            "pending_tokens": self.pending_tokens._asdict(),
+            "unused_tokens": self.unused_tokens._asdict()  # <- Added to JSON
         }
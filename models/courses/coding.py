@@ -10,14 +10,41 @@ from mongoengine import (
     DictField,
     BooleanField,
     DateTimeField,
-    ReferenceField,
+    ObjectIdField,
     FloatField,
     CASCADE,
-    NULLIFY,
     signals,
     get_db,
 )
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
+
+from models.mixins import TimestampedMixin
+
+# bulk deletes: ids per $in (keeps each command far below the 16MB BSON limit)
+_DELETE_CHUNK_SIZE = 1000
+_DELETE_WORKERS = 8
+
+
+def _chunks(xs, n):
+    for i in range(0, len(xs), n):
+        yield xs[i:i + n]
+
+
+def _delete_ids(collection, ids, session=None):
+    """
+    delete_many over `ids` in chunks of _DELETE_CHUNK_SIZE.
+    Without a session the chunks run concurrently (pymongo releases the GIL on I/O);
+    sessions are not thread-safe, so transactional deletes stay sequential.
+    """
+    batches = list(_chunks(list(ids), _DELETE_CHUNK_SIZE))
+    if not batches:
+        return 0
+    if session is not None or len(batches) == 1:
+        return sum(collection.delete_many({"_id": {"$in": b}}, session=session).deleted_count for b in batches)
+    with ThreadPoolExecutor(max_workers=min(_DELETE_WORKERS, len(batches))) as ex:
+        results = ex.map(lambda b: collection.delete_many({"_id": {"$in": b}}), batches)
+        return sum(r.deleted_count for r in results)
 
 # ---------------------------
 # Embedded documents
@@ -38,7 +65,7 @@ class SampleIO(EmbeddedDocument):
 # Base documents
 # ---------------------------
 
-class TestCase(Document):
+class TestCase(TimestampedMixin, Document):
     """
     Individual test case. Can be referenced from many TestCaseGroup documents.
     """
@@ -58,11 +85,13 @@ class TestCase(Document):
     }
 
     def save(self, *args, **kwargs):
+        if self._save_timestamp_only(**kwargs):
+            return self
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
 
 
-class TestCaseGroup(Document):
+class TestCaseGroup(TimestampedMixin, Document):
     """
     A group of testcases (e.g., "basic", "edge", "performance").
     Note: cases references should not cascade-delete the group when a TestCase is deleted,
@@ -74,9 +103,9 @@ class TestCaseGroup(Document):
     visibility = StringField(choices=("public", "hidden"), default="hidden")
     scoring_strategy = StringField(choices=("binary", "partial"), default="binary")
 
-    # Reference to TestCase documents.
-    # Use NULLIFY so that deleting a TestCase does not accidentally delete the group.
-    cases = ListField(ReferenceField(TestCase, reverse_delete_rule=NULLIFY))
+    # TestCase ids (plain ObjectIds, never dereferenced on load).
+    # Deleting a TestCase does not touch the group; cleanup is done from CourseQuestion.
+    cases = ListField(ObjectIdField())
 
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
@@ -84,17 +113,42 @@ class TestCaseGroup(Document):
     meta = {
         "collection": "testcase_groups",
         "indexes": [
-            ("question_id", "name"),
+            ("question_id", "name"),  # also serves question_id-only lookups (prefix)
             "created_at",
+            {"fields": ["cases"], "sparse": True},  # reverse lookup: groups containing a testcase
         ]
     }
 
     def save(self, *args, **kwargs):
+        if self._save_timestamp_only(**kwargs):
+            return self
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
 
+    @classmethod
+    def case_ids_for(cls, group_ids):
+        """
+        Deduplicated TestCase ids across the given groups, computed server-side
+        in one aggregation (no group documents are hydrated).
+        """
+        if not group_ids:
+            return []
+        pipeline = [
+            {"$match": {"_id": {"$in": list(group_ids)}}},
+            {"$unwind": "$cases"},
+            {"$group": {"_id": None, "ids": {"$addToSet": "$cases"}}},
+        ]
+        result = next(cls._get_collection().aggregate(pipeline), None)
+        return [tc for tc in (result["ids"] if result else []) if tc is not None]
+
+    def get_cases(self):
+        """TestCase documents for `cases`, one query, stored order kept."""
+        ids = list(self.cases or [])
+        found = TestCase.objects.in_bulk(ids)
+        return [found[i] for i in ids if i in found]
 
-class CourseQuestion(Document):
+
+class CourseQuestion(TimestampedMixin, Document):
     """
     Main question document. The delete() override will delete
     associated TestCaseGroups and TestCases in a bulk, safer way.
@@ -120,15 +174,15 @@ class CourseQuestion(Document):
 
     show_boilerplates = BooleanField(default=True)
 
-    # store ReferenceFields (rename to avoid confusing _ids suffix)
+    # TestCaseGroup ids (plain ObjectIds; resolve with get_testcase_groups())
     # When a CourseQuestion deletes its groups, we expect the groups to be removed.
-    testcase_groups = ListField(ReferenceField(TestCaseGroup, reverse_delete_rule=NULLIFY))
+    testcase_groups = ListField(ObjectIdField())
 
     published = BooleanField(default=False)
     version = IntField(default=1, min_value=1)
     authors = ListField(DictField(), default=list)  # list of authors/editors
 
-    attempt_policy = EmbeddedDocumentField(AttemptPolicy, default=AttemptPolicy())
+    attempt_policy = EmbeddedDocumentField(AttemptPolicy, default=AttemptPolicy)  # callable: fresh instance per doc
 
     sample_io = ListField(EmbeddedDocumentField(SampleIO), default=list)
 
@@ -145,14 +199,22 @@ class CourseQuestion(Document):
         "indexes": [
             ("published", "topic"),
             {"fields": ["tags"], "sparse": True},
-            {"fields": ["allowed_languages"], "sparse": True},
+            {"fields": ["testcase_groups"], "sparse": True},
         ]
     }
 
     def save(self, *args, **kwargs):
+        if self._save_timestamp_only(**kwargs):
+            return self
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
 
+    def get_testcase_groups(self):
+        """TestCaseGroup documents for `testcase_groups`, one query, stored order kept."""
+        ids = list(self.testcase_groups or [])
+        found = TestCaseGroup.objects.in_bulk(ids)
+        return [found[i] for i in ids if i in found]
+
     def delete(self, *args, use_transaction: bool = False, **kwargs):
         """
         Delete this CourseQuestion and its TestCaseGroups and TestCases.
@@ -165,22 +227,13 @@ class CourseQuestion(Document):
             - Bulk delete testcases, then groups, then the question itself.
         """
         # 1) Snapshot group ids
-        group_ids = [g.id for g in (self.testcase_groups or []) if getattr(g, "id", None)]
+        group_ids = list(self.testcase_groups or [])
         if not group_ids:
             # No groups: just delete the question
             return super().delete(*args, **kwargs)
 
-        # 2) Collect testcase ids from groups (iterate over DB to get canonical list)
-        tc_ids = []
-        # Query DB to get fresh group documents
-        groups = TestCaseGroup.objects(id__in=group_ids)
-        for g in groups:
-            # g.cases may be list of DBRefs; collect ids carefully
-            for tc in (g.cases or []):
-                if getattr(tc, "id", None):
-                    tc_ids.append(tc.id)
-        # dedupe
-        tc_ids = list(set(tc_ids))
+        # 2) Collect (deduped) testcase ids from the stored groups in one aggregation
+        tc_ids = TestCaseGroup.case_ids_for(group_ids)
 
         # 3) If using a transaction and DB supports it, perform transactional deletion
         if use_transaction:
@@ -188,19 +241,34 @@ class CourseQuestion(Document):
             # start a session and transaction
             with client.start_session() as session:
                 with session.start_transaction():
-                    if tc_ids:
-                        TestCase.objects(id__in=tc_ids).delete()
-                    TestCaseGroup.objects(id__in=group_ids).delete()
+                    _delete_ids(TestCase._get_collection(), tc_ids, session=session)
+                    _delete_ids(TestCaseGroup._get_collection(), group_ids, session=session)
                     # finally delete the question
                     super(CourseQuestion, self).delete(*args, **kwargs)
             return
 
         # 4) Non-transactional bulk deletes (best-effort)
-        if tc_ids:
-            TestCase.objects(id__in=tc_ids).delete()
-        TestCaseGroup.objects(id__in=group_ids).delete()
+        # raw delete_many on the class-cached collection handle: no QuerySet is built
+        # (neither model has delete rules or signals to honour)
+        _delete_ids(TestCase._get_collection(), tc_ids)
+        _delete_ids(TestCaseGroup._get_collection(), group_ids)
         return super().delete(*args, **kwargs)
 
+    @classmethod
+    def bulk_delete(cls, question_ids):
+        """
+        Delete many CourseQuestions plus their TestCaseGroups and TestCases,
+        one query per collection instead of one delete() per question.
+        """
+        if not question_ids:
+            return
+        group_ids = cls._get_collection().distinct("testcase_groups", {"_id": {"$in": question_ids}})
+        group_ids = [g for g in group_ids if g is not None]
+        if group_ids:
+            _delete_ids(TestCase._get_collection(), TestCaseGroup.case_ids_for(group_ids))
+            _delete_ids(TestCaseGroup._get_collection(), group_ids)
+        cls.objects(id__in=question_ids).delete()
+
     # Optional: if you want pre-delete hooks in the future
     # @classmethod
     # def pre_delete(cls, sender, document, **kwargs):
@@ -2,7 +2,7 @@
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, ReferenceField, ListField, BooleanField,
-    EmbeddedDocumentField, ValidationError
+    EmbeddedDocumentField, ObjectIdField, ValidationError
 )
 
 from models.courses.mcq import CourseMCQ
@@ -27,7 +27,7 @@ class TextUnit(EmbeddedDocument):
 
 class Unit(Document):
     name = StringField(required=True)
-    unit_type = StringField(required=True, choices=["text", "mcq","rearrange","coding"])  # extend later (e.g., video)
+    unit_type = StringField(required=True, choices=("text", "mcq", "rearrange", "coding"))  # extend later (e.g., video)
     # Store embedded payloads directly (NOT references)
     text = EmbeddedDocumentField(TextUnit, default=None)
     mcq = ReferenceField(CourseMCQ, default=None)
@@ -44,33 +44,14 @@ class Unit(Document):
             "mcq": self.mcq.to_json() if self.mcq else None,
         }
         return base
+
 # Add to Unit class
     def delete(self, *args, **kwargs):
         """
         Delete a Unit and any referenced payload documents (mcq, rearrange, coding).
         Assumes those payload docs are not shared elsewhere.
         """
-        # delete referenced payload documents if present
-        try:
-            if self.mcq:
-                # mcq is a ReferenceField -> call its delete
-                self.mcq.delete()
-        except Exception:
-            # best-effort: ignore failures but you may want to log
-            pass
-
-        try:
-            if self.rearrange:
-                self.rearrange.delete()
-        except Exception:
-            pass
-
-        try:
-            if self.coding:
-                # CourseQuestion has its own delete() that will remove testcase groups etc.
-                self.coding.delete()
-        except Exception:
-            pass
+        _delete_descendants(unit_ids=[self.id])
 
         # finally delete this Unit document
         return super(Unit, self).delete(*args, **kwargs)
@@ -86,16 +67,15 @@ class Lesson(Document):
     name = StringField(required=True)
     tagline = StringField()
     description = StringField()
-    units = ListField(ReferenceField(Unit))
+    units = ListField(ObjectIdField())  # Unit ids; resolve with get_units()
+
+    meta = {"indexes": [{"fields": ["units"], "sparse": True}]}
 
     def to_json(self):
-        return {
-            "id": str(self.id),
-            "name": self.name,
-            "tagline": self.tagline,
-            "description": self.description,
-            "units": [u.to_json() for u in self.units],
-        }
+        return _render_lessons([self.id]).get(self.id)
+
+    def get_units(self):
+        return _in_order(Unit, self.units)
 
 
 # Add to Lesson class
@@ -103,13 +83,7 @@ class Lesson(Document):
         """
         Delete a Lesson and all Units referenced by it.
         """
-        # iterate units and delete each one (per-document to trigger signals)
-        for u in (self.units or []):
-            try:
-                u.delete()
-            except Exception:
-                # ignore errors per-unit; optionally log
-                pass
+        _delete_descendants(lesson_ids=[self.id])
 
         # now delete the lesson itself
         return super(Lesson, self).delete(*args, **kwargs)
@@ -123,16 +97,15 @@ class Chapter(Document):
     name = StringField(required=True)
     tagline = StringField()
     description = StringField()
-    lessons = ListField(ReferenceField(Lesson))         # optional grouping
+    lessons = ListField(ObjectIdField())         # optional grouping; Lesson ids, resolve with get_lessons()
+
+    meta = {"indexes": [{"fields": ["lessons"], "sparse": True}]}
 
     def to_json(self):
-        return {
-            "id": str(self.id),
-            "name": self.name,
-            "tagline": self.tagline,
-            "description": self.description,
-            "lessons": [l.to_json() for l in self.lessons],
-        }
+        return _render_chapters([self.id]).get(self.id)
+
+    def get_lessons(self):
+        return _in_order(Lesson, self.lessons)
 
 
 # Add to Chapter class
@@ -140,12 +113,7 @@ class Chapter(Document):
         """
         Delete a Chapter and all its Lessons (and recursively their Units / payloads).
         """
-        # delete lessons referenced by this chapter
-        for lesson in (self.lessons or []):
-            try:
-                lesson.delete()
-            except Exception:
-                pass
+        _delete_descendants(chapter_ids=[self.id])
 
         # delete the chapter doc
         return super(Chapter, self).delete(*args, **kwargs)
@@ -158,27 +126,158 @@ class Course(Document):
     name = StringField(required=True)
     tagline = StringField()
     description = StringField()
-    chapters = ListField(ReferenceField(Chapter))
+    chapters = ListField(ObjectIdField())  # Chapter ids; resolve with get_chapters()
     thumbnail_url = StringField()  # 👈 New field for course thumbnail
+
+    meta = {"indexes": [{"fields": ["chapters"], "sparse": True}]}
+
     def to_json(self):
-        return {
-            "id": str(self.id),
-            "name": self.name,
-            "tagline": self.tagline,
-            "description": self.description,
-            "thumbnail_url": self.thumbnail_url,  # 👈 Return thumbnail
-            "chapters": [c.to_json() for c in self.chapters]
-        }
+        return _render_courses([self.id]).get(self.id)
+
+    def get_chapters(self):
+        return _in_order(Chapter, self.chapters)
 
 # Add to Course class
     def delete(self, *args, **kwargs):
         """
         Delete a Course and all Chapters (which will cascade to Lessons -> Units -> payloads).
         """
-        for ch in (self.chapters or []):
-            try:
-                ch.delete()
-            except Exception:
-                pass
+        _delete_descendants(course_ids=[self.id])
+
+        return super(Course, self).delete(*args, **kwargs)
+
+    @classmethod
+    def _collect_descendant_ids(cls, course_ids=(), chapter_ids=(), lesson_ids=(), unit_ids=()):
+        """
+        Walk the reference tree below the given roots, one query per level,
+        and return every descendant id (roots excluded) grouped by collection.
+        """
+        chapters = _referenced_ids(cls, "chapters", course_ids)
+        lessons = _referenced_ids(Chapter, "lessons", chapters | set(chapter_ids))
+        units = _referenced_ids(Lesson, "units", lessons | set(lesson_ids))
+        payload_units = units | set(unit_ids)
+
+        return {
+            "chapters": chapters,
+            "lessons": lessons,
+            "units": units,
+            "mcqs": _referenced_ids(Unit, "mcq", payload_units),
+            "rearranges": _referenced_ids(Unit, "rearrange", payload_units),
+            "questions": _referenced_ids(Unit, "coding", payload_units),
+        }
+
+
+def _referenced_ids(doc_cls, field, ids):
+    """Distinct ids stored in `field` across the given documents (no dereferencing)."""
+    if not ids:
+        return set()
+    values = doc_cls._get_collection().distinct(field, {"_id": {"$in": list(ids)}})
+    return {v for v in values if v is not None}
+
+
+def _delete_descendants(**root_ids):
+    """
+    Bulk-delete everything below the given roots with one delete per collection.
+    The roots themselves are left for the caller's own delete().
+    """
+    ids = Course._collect_descendant_ids(**root_ids)
+
+    # CourseQuestion.bulk_delete also removes testcase groups and testcases
+    if ids["questions"]:
+        CourseQuestion.bulk_delete(list(ids["questions"]))
+    if ids["mcqs"]:
+        CourseMCQ.objects(id__in=list(ids["mcqs"])).delete()
+    if ids["rearranges"]:
+        CourseRearrange.objects(id__in=list(ids["rearranges"])).delete()
+    if ids["units"]:
+        Unit.objects(id__in=list(ids["units"])).delete()
+    if ids["lessons"]:
+        Lesson.objects(id__in=list(ids["lessons"])).delete()
+    if ids["chapters"]:
+        Chapter.objects(id__in=list(ids["chapters"])).delete()
+
+
+# ---------------------------
+# Tree rendering (prefetch one level at a time, build JSON from raw dicts)
+# ---------------------------
+
+def _fetch_raw(doc_cls, ids):
+    """Fetch raw documents for `ids` in a single query, keyed by _id."""
+    if not ids:
+        return {}
+    return {d["_id"]: d for d in doc_cls.objects(id__in=list(ids)).as_pymongo()}
+
+
+def _in_order(doc_cls, ids):
+    """Resolve an id list to documents in one query, keeping the stored order."""
+    ids = list(ids or [])
+    found = doc_cls.objects.in_bulk(ids)
+    return [found[i] for i in ids if i in found]
 
-        return super(Course, self).delete(*args, **kwargs)
\ No newline at end of file
+
+def _children(docs, field):
+    """All child ids referenced from `field` across the raw parent docs."""
+    return {cid for d in docs.values() for cid in (d.get(field) or [])}
+
+
+def _render_units(unit_ids):
+    units = _fetch_raw(Unit, unit_ids)
+    mcqs = _fetch_raw(CourseMCQ, {u.get("mcq") for u in units.values()} - {None})
+    out = {}
+    for uid, u in units.items():
+        text = u.get("text")
+        mcq = mcqs.get(u.get("mcq"))
+        out[uid] = {
+            "id": str(uid),
+            "name": u.get("name"),
+            "unit_type": u.get("unit_type"),
+            "text": {"content": text.get("content")} if text else None,
+            "mcq": CourseMCQ.serialize_raw(mcq) if mcq else None,
+        }
+    return out
+
+
+def _render_lessons(lesson_ids):
+    lessons = _fetch_raw(Lesson, lesson_ids)
+    units = _render_units(_children(lessons, "units"))
+    return {
+        lid: {
+            "id": str(lid),
+            "name": l.get("name"),
+            "tagline": l.get("tagline"),
+            "description": l.get("description"),
+            "units": [units[u] for u in (l.get("units") or []) if u in units],
+        }
+        for lid, l in lessons.items()
+    }
+
+
+def _render_chapters(chapter_ids):
+    chapters = _fetch_raw(Chapter, chapter_ids)
+    lessons = _render_lessons(_children(chapters, "lessons"))
+    return {
+        cid: {
+            "id": str(cid),
+            "name": c.get("name"),
+            "tagline": c.get("tagline"),
+            "description": c.get("description"),
+            "lessons": [lessons[l] for l in (c.get("lessons") or []) if l in lessons],
+        }
+        for cid, c in chapters.items()
+    }
+
+
+def _render_courses(course_ids):
+    courses = _fetch_raw(Course, course_ids)
+    chapters = _render_chapters(_children(courses, "chapters"))
+    return {
+        cid: {
+            "id": str(cid),
+            "name": c.get("name"),
+            "tagline": c.get("tagline"),
+            "description": c.get("description"),
+            "thumbnail_url": c.get("thumbnail_url"),  # 👈 Return thumbnail
+            "chapters": [chapters[ch] for ch in (c.get("chapters") or []) if ch in chapters],
+        }
+        for cid, c in courses.items()
+    }
@@ -1,12 +1,15 @@
 # models/mcq.py
 
+import time
 import uuid
 from mongoengine import (
     Document, EmbeddedDocument,
-    StringField, ListField, EmbeddedDocumentField,
+    StringField, ListField,
     IntField, BooleanField, FloatField, BooleanField, DictField
 )
 
+from models.mixins import PartialSaveMixin
+
 
 class Option(EmbeddedDocument):
     """Options for MCQ"""
@@ -14,6 +17,15 @@ class Option(EmbeddedDocument):
     value = StringField(required=True)
 
 
+def _option_dict(option):
+    """Normalize an Option (or dict) into the stored {"option_id", "value"} dict."""
+    if isinstance(option, Option):
+        option = {"option_id": option.option_id, "value": option.value}
+    if not isinstance(option, dict) or not option.get("value"):
+        raise ValueError("Each option needs a non-empty 'value'")
+    return {"option_id": option.get("option_id") or str(uuid.uuid4()), "value": option["value"]}
+
+
 class CourseMCQConfig(Document):
     """Stores Config data auto-created from MCQ"""
     difficulty_levels = ListField(StringField())
@@ -24,12 +36,26 @@ class CourseMCQConfig(Document):
     meta = {"collection": "mcq_configs"}
 
 
-class CourseMCQ(Document):
+# Values this process already pushed into CourseMCQConfig; lets _sync_config skip
+# the write when nothing is new. Cleared after the TTL so external edits are picked up.
+_CONFIG_CACHE_TTL_SECONDS = 30
+_CONFIG_CACHE = {"expires": 0.0, "difficulty_levels": set(), "topics": set(), "subtopics": set(), "tags": set()}
+
+
+def invalidate_config_cache():
+    """Forget cached CourseMCQConfig values (next save writes through again)."""
+    for key in ("difficulty_levels", "topics", "subtopics", "tags"):
+        _CONFIG_CACHE[key] = set()
+    _CONFIG_CACHE["expires"] = time.time() + _CONFIG_CACHE_TTL_SECONDS
+
+
+class CourseMCQ(PartialSaveMixin, Document):
     """Main MCQ Model"""
     title = StringField(required=True)
     question_text = StringField(required=True)
 
-    options = ListField(EmbeddedDocumentField(Option), required=True)
+    # plain {"option_id", "value"} dicts: same BSON as the old embedded Option docs, no per-option hydration
+    options = ListField(DictField(), required=True)
     correct_options = ListField(StringField(), required=True)  # list of option_ids
 
     is_multiple = BooleanField(default=False)
@@ -37,7 +63,7 @@ class CourseMCQ(Document):
     marks = FloatField(required=True, min_value=0)
     negative_marks = FloatField(required=True, min_value=0)
 
-    difficulty_level = StringField(choices=["Easy", "Medium", "Hard"], required=True)
+    difficulty_level = StringField(choices=("Easy", "Medium", "Hard"), required=True)
 
     explanation = StringField()
     tags = ListField(StringField())
@@ -52,6 +78,7 @@ class CourseMCQ(Document):
 
     def clean(self):
         """Validation before saving"""
+        self.options = [_option_dict(o) for o in (self.options or [])]
         if not self.is_multiple and len(self.correct_options) > 1:
             raise ValueError("Multiple correct options not allowed unless is_multiple=True")
 
@@ -62,34 +89,50 @@ class CourseMCQ(Document):
         # Save MCQ first
         result = super(CourseMCQ, self).save(*args, **kwargs)
 
-        # Update CourseMCQConfig
-        config = CourseMCQConfig.objects.first()
-        if not config:
-            config = CourseMCQConfig()
+        self._sync_config()
 
-        if self.difficulty_level not in config.difficulty_levels:
-            config.difficulty_levels.append(self.difficulty_level)
-
-        if self.topic and self.topic not in config.topics:
-            config.topics.append(self.topic)
-
-        if self.subtopic and self.subtopic not in config.subtopics:
-            config.subtopics.append(self.subtopic)
+        return result
 
-        for tag in self.tags or []:
-            if tag not in config.tags:
-                config.tags.append(tag)
+    def save_partial(self, **changes):
+        """Partial save; keeps CourseMCQConfig in sync when config-tracked fields change."""
+        result = super(CourseMCQ, self).save_partial(**changes)
+        if changes.keys() & {"difficulty_level", "topic", "subtopic", "tags"}:
+            self._sync_config()
+        return result
 
-        config.save()
+    def _sync_config(self):
+        """Add this MCQ's level/topic/subtopic/tags to CourseMCQConfig."""
+        if time.time() > _CONFIG_CACHE["expires"]:
+            invalidate_config_cache()
+
+        values = {
+            "difficulty_levels": [self.difficulty_level],
+            "topics": [self.topic],
+            "subtopics": [self.subtopic],
+            "tags": list(self.tags or []),
+        }
+        # only values this process hasn't already written
+        missing = {
+            key: [v for v in vals if v and v not in _CONFIG_CACHE[key]]
+            for key, vals in values.items()
+        }
+        add_to_set = {key: {"$each": vals} for key, vals in missing.items() if vals}
+        if not add_to_set:
+            return
+
+        # Update CourseMCQConfig in one atomic round trip; $addToSet dedupes server-side.
+        # empty filter targets the existing singleton config (or creates it)
+        CourseMCQConfig._get_collection().update_one({}, {"$addToSet": add_to_set}, upsert=True)
+        for key, op in add_to_set.items():
+            _CONFIG_CACHE[key].update(op["$each"])
 
-        return result
     def to_json(self):
         """Convert MCQ document to dict/JSON"""
         return {
             "id": str(self.id),
             "title": self.title,
             "question_text": self.question_text,
-            "options": [{"option_id": o.option_id, "value": o.value} for o in self.options],
+            "options": list(self.options or []),
             "correct_options": self.correct_options,
             "is_multiple": self.is_multiple,
             "marks": self.marks,
@@ -101,4 +144,25 @@ class CourseMCQ(Document):
             "topic": self.topic,
             "subtopic": self.subtopic,
             "created_by": self.created_by,
+        }
+
+    @staticmethod
+    def serialize_raw(doc):
+        """Same shape as to_json(), built from a raw pymongo dict."""
+        return {
+            "id": str(doc["_id"]),
+            "title": doc.get("title"),
+            "question_text": doc.get("question_text"),
+            "options": [{"option_id": o.get("option_id"), "value": o.get("value")} for o in doc.get("options", [])],
+            "correct_options": doc.get("correct_options", []),
+            "is_multiple": doc.get("is_multiple", False),
+            "marks": doc.get("marks"),
+            "negative_marks": doc.get("negative_marks"),
+            "difficulty_level": doc.get("difficulty_level"),
+            "explanation": doc.get("explanation"),
+            "tags": doc.get("tags", []),
+            "time_limit": doc.get("time_limit"),
+            "topic": doc.get("topic"),
+            "subtopic": doc.get("subtopic"),
+            "created_by": doc.get("created_by"),
         }
\ No newline at end of file
@@ -1,6 +1,7 @@
 # models/rearrange.py
 
 import uuid
+from operator import attrgetter
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, ListField, EmbeddedDocumentField,
@@ -8,6 +9,9 @@ from mongoengine import (
 )
 
 
+_item_fields = attrgetter("item_id", "value")
+
+
 class Item(EmbeddedDocument):
     """Single item/segment for a rearrange question"""
     item_id = StringField(required=True, default=lambda: str(uuid.uuid4()))
@@ -75,27 +79,23 @@ class CourseRearrange(Document):
         # Save CourseRearrange first
         result = super(CourseRearrange, self).save(*args, **kwargs)
 
-        # Update CourseRearrangeConfig
-        config = CourseRearrangeConfig.objects.first()
-        if not config:
-            config = CourseRearrangeConfig()
-
-        if self.difficulty_level and self.difficulty_level not in config.difficulty_levels:
-            config.difficulty_levels.append(self.difficulty_level)
-
-        if self.topic and self.topic not in config.topics:
-            config.topics.append(self.topic)
+        self._sync_config()
 
-        if self.subtopic and self.subtopic not in config.subtopics:
-            config.subtopics.append(self.subtopic)
-
-        for tag in self.tags or []:
-            if tag not in config.tags:
-                config.tags.append(tag)
+        return result
 
-        config.save()
+    def _sync_config(self):
+        """Add this question's level/topic/subtopic/tags to CourseRearrangeConfig."""
+        # one atomic round trip; $addToSet dedupes server-side (no Python-side list scans)
+        add_to_set = {"tags": {"$each": list(self.tags or [])}}
+        if self.difficulty_level:
+            add_to_set["difficulty_levels"] = self.difficulty_level
+        if self.topic:
+            add_to_set["topics"] = self.topic
+        if self.subtopic:
+            add_to_set["subtopics"] = self.subtopic
 
-        return result
+        # empty filter targets the existing singleton config (or creates it)
+        CourseRearrangeConfig._get_collection().update_one({}, {"$addToSet": add_to_set}, upsert=True)
 
     def to_json(self):
         """Convert CourseRearrange document to dict/JSON"""
@@ -103,7 +103,7 @@ class CourseRearrange(Document):
             "id": str(self.id),
             "title": self.title,
             "prompt": self.prompt,
-            "items": [{"item_id": i.item_id, "value": i.value} for i in self.items],
+            "items": [{"item_id": i, "value": v} for i, v in map(_item_fields, self.items)],
             "correct_order": self.correct_order,
             "is_drag_and_drop": self.is_drag_and_drop,
             "marks": self.marks,
@@ -0,0 +1,82 @@
+# models/mixins.py
+from pymongo import ReturnDocument
+
+
+class PartialSaveMixin:
+    """
+    Mixin for Documents that adds save_partial(): write only the changed
+    fields instead of running a full save() (validation + to_mongo over
+    every field).
+    """
+
+    def _mongo_set(self, changes):
+        """Convert {field_name: value} into a {db_field: bson_value} $set document."""
+        return {
+            self._fields[name].db_field: self._fields[name].to_mongo(value)
+            for name, value in changes.items()
+        }
+
+    def save_partial(self, **changes):
+        """
+        $set only the given fields, e.g. question.save_partial(points=50).
+        Values are converted field-by-field; no full-document validation runs.
+        """
+        if not changes:
+            return False
+        result = self._get_collection().update_one({"_id": self.pk}, {"$set": self._mongo_set(changes)})
+
+        # keep the in-memory document in sync with what was written
+        for name, value in changes.items():
+            setattr(self, name, value)
+        return result.matched_count > 0
+
+
+class TimestampedMixin(PartialSaveMixin):
+    """
+    Mixin for Documents with an `updated_at` field.
+    Adds partial updates that stamp `updated_at` with the server clock.
+    """
+
+    def update_fields(self, **kwargs):
+        """
+        $set only the given fields and set updated_at via $currentDate,
+        skipping full-document validation and to_mongo().
+        Example: question.update_fields(published=True)
+        """
+        update = {"$currentDate": {"updated_at": True}}
+        if kwargs:
+            update["$set"] = self._mongo_set(kwargs)
+
+        doc = self._get_collection().find_one_and_update(
+            {"_id": self.pk},
+            update,
+            projection={"updated_at": True},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        # keep the in-memory document in sync with what was written
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+        if doc:
+            self.updated_at = doc.get("updated_at")
+        return doc is not None
+
+    def _save_timestamp_only(self, **save_kwargs):
+        """
+        For save() overrides: if this is an existing document and nothing but
+        updated_at changed, bump updated_at with a raw update instead of a
+        full validate + to_mongo save. Returns True when it handled the save.
+        """
+        if self._created or self.pk is None or save_kwargs.get("force_insert"):
+            return False
+        if not set(self._changed_fields) <= {"updated_at"}:
+            return False
+        self.update_fields()
+        self._clear_changed_fields()
+        return True
+
+    def save_partial(self, **changes):
+        """Partial save that also bumps updated_at, like the full save() overrides do."""
+        if not changes:
+            return False
+        return self.update_fields(**changes)
@@ -98,7 +98,7 @@ class Question(Document):
     version = IntField(default=1, min_value=1)
     authors = ListField(DictField(), default=list)  # list of authors/editors
 
-    attempt_policy = EmbeddedDocumentField(AttemptPolicy, default=AttemptPolicy())  # instance
+    attempt_policy = EmbeddedDocumentField(AttemptPolicy, default=AttemptPolicy)  # callable: fresh instance per doc
 
     sample_io = ListField(EmbeddedDocumentField(SampleIO), default=list)
 
@@ -116,7 +116,6 @@ class Question(Document):
         "indexes": [
             ("published", "topic"),
             {"fields": ["tags"], "sparse": True},
-            {"fields": ["allowed_languages"], "sparse": True},  # optional: query by language
         ]
     }
 
@@ -1,11 +1,16 @@
 # models/mcq.py
 
+import time
 import uuid
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, ListField, EmbeddedDocumentField,
     IntField, BooleanField, FloatField, BooleanField, DictField
 )
+from utils.cache import cache_delete
+
+# Redis key of list_mcqs' topics/subtopics/tags/difficulty_levels block
+MCQ_META_CACHE_KEY = "mcq:meta:v1"
 
 
 class Option(EmbeddedDocument):
@@ -24,9 +29,34 @@ class MCQConfig(Document):
     meta = {"collection": "mcq_configs"}
 
 
+# MCQConfig is one small, rarely written document: readers keep it per process for a minute
+_CONFIG_TTL_SECONDS = 60
+_config_cache = None  # (expires_at, MCQConfig or None)
+
+
+def get_mcq_config(fresh=False):
+    """MCQConfig.objects.first(), cached in-process for _CONFIG_TTL_SECONDS
+    (fresh=True reads the database and refreshes the cache)."""
+    global _config_cache
+    now = time.monotonic()
+    if not fresh and _config_cache is not None and _config_cache[0] > now:
+        return _config_cache[1]
+    config = MCQConfig.objects.first()
+    _config_cache = (now + _CONFIG_TTL_SECONDS, config)
+    return config
+
+
+def bust_config_cache():
+    """Drop this process's cached MCQConfig; call after writing it."""
+    global _config_cache
+    _config_cache = None
+
+
 class MCQ(Document):
     """Main MCQ Model"""
     title = StringField(required=True)
+    # lowercase copy of title (kept in sync by clean()) for the indexed search_mode=prefix
+    title_lc = StringField()
     question_text = StringField(required=True)
 
     options = ListField(EmbeddedDocumentField(Option), required=True)
@@ -48,10 +78,23 @@ class MCQ(Document):
     created_by = DictField(required=True,default=lambda: {"id": "system", "name": "System"})
 
 
-    meta = {"collection": "mcqs"}
+    meta = {
+        "collection": "mcqs",
+        # list_mcqs: its filters, its sorts (id as tie-breaker) and a text index for search
+        "indexes": [
+            ("topic", "subtopic", "difficulty_level", "-id"),
+            "tags",
+            ("-marks", "-id"),
+            ("-time_limit", "-id"),
+            ("title", "id"),  # title sort
+            "title_lc",  # search_mode=prefix: anchored case-sensitive regex on the lowercase shadow
+            {"fields": ["$title", "$question_text"], "default_language": "english"},
+        ],
+    }
 
     def clean(self):
         """Validation before saving"""
+        self.title_lc = self.title.lower() if isinstance(self.title, str) else None
         if not self.is_multiple and len(self.correct_options) > 1:
             raise ValueError("Multiple correct options not allowed unless is_multiple=True")
 
@@ -81,6 +124,8 @@ class MCQ(Document):
                 config.tags.append(tag)
 
         config.save()
+        bust_config_cache()
+        cache_delete(MCQ_META_CACHE_KEY)
 
         return result
     def to_json(self):
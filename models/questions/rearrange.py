@@ -1,6 +1,7 @@
 # models/rearrange.py
 
 import uuid
+from operator import attrgetter
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, ListField, EmbeddedDocumentField,
@@ -8,6 +9,9 @@ from mongoengine import (
 )
 
 
+_item_fields = attrgetter("item_id", "value")
+
+
 class Item(EmbeddedDocument):
     """Single item/segment for a rearrange question"""
     item_id = StringField(required=True, default=lambda: str(uuid.uuid4()))
@@ -56,17 +60,23 @@ class Rearrange(Document):
         if not self.items or len(self.items) == 0:
             raise ValueError("At least one item is required")
 
-        item_ids = [it.item_id for it in self.items]
+        item_ids = {it.item_id for it in self.items}
 
         # correct_order must contain exactly the same ids as items (same length, no unknowns, no duplicates)
-        if len(self.correct_order) != len(item_ids):
+        if len(self.correct_order) != len(self.items):
             raise ValueError("correct_order must contain the same number of ids as items")
 
-        if set(self.correct_order) != set(item_ids):
+        if len(item_ids) != len(self.items):
             raise ValueError("correct_order must be a permutation of item ids from `items`")
 
-        if len(self.correct_order) != len(set(self.correct_order)):
-            raise ValueError("correct_order contains duplicate item ids")
+        # single pass: equal length + every id known + no repeats => permutation
+        seen = set()
+        for item_id in self.correct_order:
+            if item_id not in item_ids:
+                raise ValueError("correct_order must be a permutation of item ids from `items`")
+            if item_id in seen:
+                raise ValueError("correct_order contains duplicate item ids")
+            seen.add(item_id)
 
     def save(self, *args, **kwargs):
         """Override save to auto-update/create RearrangeConfig"""
@@ -75,25 +85,20 @@ class Rearrange(Document):
         # Save Rearrange first
         result = super(Rearrange, self).save(*args, **kwargs)
 
-        # Update RearrangeConfig
-        config = RearrangeConfig.objects.first()
-        if not config:
-            config = RearrangeConfig()
-
-        if self.difficulty_level and self.difficulty_level not in config.difficulty_levels:
-            config.difficulty_levels.append(self.difficulty_level)
-
-        if self.topic and self.topic not in config.topics:
-            config.topics.append(self.topic)
-
-        if self.subtopic and self.subtopic not in config.subtopics:
-            config.subtopics.append(self.subtopic)
-
-        for tag in self.tags or []:
-            if tag not in config.tags:
-                config.tags.append(tag)
-
-        config.save()
+        # Update RearrangeConfig in one atomic round trip; $addToSet dedupes server-side
+        add_to_set = {}
+        if self.difficulty_level:
+            add_to_set["difficulty_levels"] = self.difficulty_level
+        if self.topic:
+            add_to_set["topics"] = self.topic
+        if self.subtopic:
+            add_to_set["subtopics"] = self.subtopic
+        if self.tags:
+            add_to_set["tags"] = {"$each": list(dict.fromkeys(self.tags))}
+
+        if add_to_set:
+            # empty filter targets the existing singleton config (or creates it)
+            RearrangeConfig._get_collection().update_one({}, {"$addToSet": add_to_set}, upsert=True)
 
         return result
 
@@ -103,7 +108,7 @@ class Rearrange(Document):
             "id": str(self.id),
             "title": self.title,
             "prompt": self.prompt,
-            "items": [{"item_id": i.item_id, "value": i.value} for i in self.items],
+            "items": [{"item_id": i, "value": v} for i, v in map(_item_fields, self.items)],
             "correct_order": self.correct_order,
             "is_drag_and_drop": self.is_drag_and_drop,
             "marks": self.marks,
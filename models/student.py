@@ -5,7 +5,14 @@ from mongoengine import (
     ListField, BooleanField, DateTimeField, FloatField, DictField, ReferenceField,
     NULLIFY
 )
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from utils.passwords import hash_password
+
+# fields matched by the list search; each has a lowercase copy <field>_lc so the
+# search can be an anchored, case-sensitive prefix regex that walks an index
+SEARCH_FIELDS = ("name", "email", "usn", "enrollment_number")
+
+
 class Student(Document):
     # Basic details
     name = StringField(required=True)
@@ -41,20 +48,58 @@ class Student(Document):
     is_active = BooleanField(default=True)
     date_joined = DateTimeField(default=datetime.utcnow)
 
+    # Search shadows (kept in sync by clean() / search_shadow(); see SEARCH_FIELDS)
+    name_lc = StringField()
+    email_lc = StringField()
+    usn_lc = StringField()
+    enrollment_number_lc = StringField()
+
     meta = {
         "collection": "students",
         "indexes": [
             {"fields": ["email"], "unique": True},
-            {"fields": ["usn"], "unique": True, "sparse": True},
-            {"fields": ["enrollment_number"], "unique": True, "sparse": True}
+            # partial (not sparse): only string values are indexed/unique-checked, so
+            # documents without the field or with null stay out of the index
+            {
+                "fields": ["usn"], "unique": True, "name": "usn_partial_unique",
+                "partialFilterExpression": {"usn": {"$type": "string"}},
+            },
+            {
+                "fields": ["enrollment_number"], "unique": True, "name": "enrollment_number_partial_unique",
+                "partialFilterExpression": {"enrollment_number": {"$type": "string"}},
+            },
+            # list_students: college equality + default sort by name (no in-memory SORT)
+            ("college", "name"),
+            # list_students filters: branch / year_of_study within a college
+            ("college", "branch", "year_of_study"),
+            # list_students min/max cgpa range within a college
+            ("college", "cgpa"),
+            # prefix search within a college
+            ("college", "name_lc"),
+            ("college", "email_lc"),
+            ("college", "usn_lc"),
+            ("college", "enrollment_number_lc"),
         ]
     }
 
     def __str__(self):
         return f"{self.usn or 'N/A'} - {self.name}"
 
+    def clean(self):
+        for field, value in self.search_shadow({f: getattr(self, f) for f in SEARCH_FIELDS}).items():
+            setattr(self, field, value)
+
+    @staticmethod
+    def search_shadow(values):
+        """{"<field>_lc": lowercased value} for the SEARCH_FIELDS present in `values`.
+        Add it to raw $set updates so the shadows don't go stale."""
+        return {
+            f"{f}_lc": values[f].lower() if isinstance(values[f], str) else None
+            for f in SEARCH_FIELDS if f in values
+        }
+
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
@@ -1,15 +1,30 @@
 # models/section.py
 from datetime import datetime
+from importlib import import_module
+from bson import ObjectId
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, BooleanField, DateTimeField,
-    ReferenceField, ListField, EmbeddedDocumentField, IntField
+    ObjectIdField, ListField, EmbeddedDocumentField, IntField
 )
 
-from models.test.questions.mcq import MCQ
-# (later you’ll import CodingQuestion, RearrangeQuestion when models exist)
-# from models.test.questions.coding import CodingQuestion
-# from models.test.questions.rearrange import RearrangeQuestion
+# question_type -> "module:Class" of the model holding question_id, imported on first use
+# so loading Section doesn't pull in every question module. A dotted path rather than
+# mongoengine's class-name registry: "MCQ" names both the bank and the test model.
+# (coding/rearrange: add when models.test.questions.coding / .rearrange exist)
+QUESTION_MODELS = {
+    "mcq": "models.test.questions.mcq:MCQ",
+}
+_resolved_models = {}
+
+
+def question_model(question_type):
+    """Model class for `question_type`, or None if that type has no model yet."""
+    model = _resolved_models.get(question_type)
+    if model is None and question_type in QUESTION_MODELS:
+        module_name, cls_name = QUESTION_MODELS[question_type].split(":")
+        model = _resolved_models[question_type] = getattr(import_module(module_name), cls_name)
+    return model
 
 
 class SectionQuestion(EmbeddedDocument):
@@ -19,10 +34,11 @@ class SectionQuestion(EmbeddedDocument):
         choices=["mcq", "coding", "rearrange"]
     )
 
-    # Keep three separate references — only one is expected to be non-null
-    mcq_ref = ReferenceField(MCQ, null=True)
-    coding_ref = ReferenceField('CodingQuestion', null=True)      # placeholder
-    rearrange_ref = ReferenceField('RearrangeQuestion', null=True)  # placeholder
+    # Tagged reference: one ObjectId, the collection is picked by question_type
+    # (replaces the mcq_ref/coding_ref/rearrange_ref trio; see migrate_section_questions.py)
+    # No per-entry fetch on purpose: resolving entries one at a time in a loop is N+1.
+    # Use Section.resolve_questions() (loaded section) or Section.load_with_questions().
+    question_id = ObjectIdField(required=True)
 
 
 class Section(Document):
@@ -37,12 +53,64 @@ class Section(Document):
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
 
-    meta = {"collection": "sections", "indexes": ["time_restricted", "name"]}
+    meta = {
+        "collection": "sections",
+        # filter on time_restricted, sort by name: one index serves both (no in-memory SORT)
+        "indexes": [("time_restricted", "name")],
+    }
 
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
 
+    def resolve_questions(self):
+        """
+        [(SectionQuestion, document or None), ...] in stored order.
+        Ids are bucketed by question_type: one in_bulk query per type instead of one per entry.
+        """
+        questions = self.questions or []
+        ids_by_type = {}
+        for sq in questions:
+            ids_by_type.setdefault(sq.question_type, []).append(sq.question_id)
+
+        found = {}
+        for question_type, ids in ids_by_type.items():
+            model = question_model(question_type)
+            if model is not None:
+                found[question_type] = model.objects.in_bulk(ids)
+
+        return [(sq, found.get(sq.question_type, {}).get(sq.question_id)) for sq in questions]
+
+    @classmethod
+    def load_with_questions(cls, section_id):
+        """
+        Like resolve_questions() on the loaded section, in one round trip: the section's
+        questions plus one $lookup per question type. Returns None if the section doesn't exist.
+        """
+        models = {t: question_model(t) for t in QUESTION_MODELS}
+        pipeline = [
+            {"$match": {"_id": ObjectId(section_id)}},
+            {"$project": {"questions": 1}},
+        ]
+        for question_type, model in models.items():
+            pipeline.append({"$lookup": {
+                "from": model._get_collection_name(),
+                "localField": "questions.question_id",
+                "foreignField": "_id",
+                "as": f"_{question_type}",
+            }})
+        doc = next(cls._get_collection().aggregate(pipeline), None)
+        if doc is None:
+            return None
+
+        # $lookup doesn't keep the order of the id array; match each entry within its own type
+        found = {
+            question_type: {d["_id"]: model._from_son(d) for d in doc.get(f"_{question_type}", [])}
+            for question_type, model in models.items()
+        }
+        questions = [SectionQuestion._from_son(q) for q in doc.get("questions", [])]
+        return [(sq, found.get(sq.question_type, {}).get(sq.question_id)) for sq in questions]
+
     def to_json(self):
         return {
             "id": str(self.id),
@@ -53,3 +121,17 @@ class Section(Document):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
+
+    @staticmethod
+    def son_to_json(doc):
+        """to_json() for a raw section dict (as_pymongo()), without building a Section."""
+        created_at, updated_at = doc.get("created_at"), doc.get("updated_at")
+        return {
+            "id": str(doc["_id"]),
+            "name": doc.get("name"),
+            "description": doc.get("description") or "",
+            "instructions": doc.get("instructions") or "",
+            "time_restricted": doc.get("time_restricted", False),
+            "created_at": created_at.isoformat() if created_at else None,
+            "updated_at": updated_at.isoformat() if updated_at else None,
+        }
@@ -14,11 +14,23 @@ from models.test.section import Section
 # ensure Section class is importable here
 # avoid circular import by using the string name 'Section' in ReferenceField
 
+def _ref_ids(refs):
+    """str ids for a list of references without dereferencing them
+    (raw ObjectId, DBRef or an already-loaded Section)"""
+    return [str(getattr(ref, "id", ref)) for ref in refs or []]
+
+
+# fields read by Test.to_minimal_json(); list endpoints project to these
+MINIMAL_FIELDS = ("test_name", "description", "instructions", "start_datetime", "end_datetime")
+
+
 class Test(Document):
     """Model for Tests"""
 
     test_name = StringField(required=True)
     description = StringField()
+    # lowercase copy of test_name (kept in sync by clean()) for the indexed "^prefix" search
+    test_name_lc = StringField()
 
     start_datetime = DateTimeField(required=True)
     end_datetime = DateTimeField(required=True)
@@ -34,10 +46,32 @@ class Test(Document):
     sections_time_restricted = ListField(ReferenceField("Section", reverse_delete_rule=PULL))
     sections_open = ListField(ReferenceField("Section", reverse_delete_rule=PULL))
 
-    meta = {"collection": "tests", "indexes": ["start_datetime", "end_datetime", "test_name"]}
+    meta = {
+        "collection": "tests",
+        "indexes": [
+            # ongoing listing: start_datetime <= now <= end_datetime, both bounds from the index
+            ("start_datetime", "end_datetime"),
+            # upcoming/all listings: start_datetime range sorted by (start_datetime, id),
+            # the id tiebreak of _paginate_and_respond included so there is no in-memory sort
+            ("start_datetime", "id"),
+            # past listing: end_datetime < now sorted by (-end_datetime, -id)
+            ("end_datetime", "id"),
+            # list ETags: newest updated_at of the whole collection
+            "-updated_at",
+            # _apply_search "^prefix": anchored case-sensitive regex on the lowercase shadow
+            "test_name_lc",
+            # _apply_search: $text over name/instructions/description, name matches rank highest
+            {
+                "fields": ["$test_name", "$description", "$instructions"],
+                "default_language": "english",
+                "weights": {"test_name": 10, "instructions": 5, "description": 1},
+            },
+        ],
+    }
 
     def clean(self):
         """Validation before saving"""
+        self.test_name_lc = self.test_name.lower() if isinstance(self.test_name, str) else None
         if self.start_datetime and self.end_datetime:
             if self.start_datetime >= self.end_datetime:
                 raise ValueError("start_datetime must be earlier than end_datetime")
@@ -45,9 +79,10 @@ class Test(Document):
     def save(self, *args, **kwargs):
         """Auto-update timestamps and run validation"""
         self.clean()
-        self.updated_at = datetime.utcnow()
+        now = datetime.utcnow()
+        self.updated_at = now
         if not self.created_at:
-            self.created_at = datetime.utcnow()
+            self.created_at = now
         return super(Test, self).save(*args, **kwargs)
 
     def to_json(self):
@@ -63,9 +98,9 @@ class Test(Document):
             "created_by": self.created_by,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            # include sections if you want (convert refs to ids)
-            "sections_time_restricted": [str(s.id) for s in (self.sections_time_restricted or [])],
-            "sections_open": [str(s.id) for s in (self.sections_open or [])],
+            # read the raw refs from _data: only ids are emitted, so skip the per-section fetch
+            "sections_time_restricted": _ref_ids(self._data.get("sections_time_restricted")),
+            "sections_open": _ref_ids(self._data.get("sections_open")),
         }
 
     def to_minimal_json(self):
@@ -77,3 +112,18 @@ class Test(Document):
             "start_datetime": self.start_datetime.isoformat() if self.start_datetime else None,
             "end_datetime": self.end_datetime.isoformat() if self.end_datetime else None,
         }
+
+    @staticmethod
+    def son_to_minimal_json(doc, _iso=datetime.isoformat):
+        """to_minimal_json() for a raw test dict (as_pymongo()), without building a Test.
+        Runs once per list row: dict.get and isoformat are bound once per call/definition."""
+        get = doc.get
+        start, end = get("start_datetime"), get("end_datetime")
+        return {
+            "id": str(doc["_id"]),
+            "test_name": get("test_name"),
+            "description": get("description"),
+            "notes": get("instructions"),
+            "start_datetime": _iso(start) if start else None,
+            "end_datetime": _iso(end) if end else None,
+        }
@@ -1,13 +1,25 @@
 # routes/collegeadmin.py
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
-from mongoengine.errors import DoesNotExist
-from utils.jwt import create_access_token, verify_access_token
+from werkzeug.security import check_password_hash
+from utils.jwt import create_access_token, verify_access_token, BEARER_PREFIX, BEARER_PREFIX_LEN
 from utils.response import response
+from utils.passwords import hash_password
 from models.college import CollegeAdmin, College
 
 collegeadmin_bp = Blueprint("collegeadmin", __name__, url_prefix="/collegeadmin")
 
+# legacy plaintext passwords are upgraded off the request path
+_rehash_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pw-rehash")
+
+
+def _rehash_and_save(admin_id, password):
+    """Hash a legacy plaintext password and store it (runs on _rehash_executor).
+    Matching on the plaintext value skips admins who changed their password meanwhile."""
+    CollegeAdmin.objects(id=admin_id, password=password).update_one(
+        set__password=hash_password(password)
+    )
+
 
 def token_required(f):
     """Decorator to protect routes using Authorization: Bearer <token>"""
@@ -16,10 +28,10 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_header = request.headers.get("Authorization", None)
-        if not auth_header or not auth_header.startswith("Bearer "):
+        if not auth_header or not auth_header.startswith(BEARER_PREFIX):
             return response(False, "Authorization header missing or malformed"), 401
 
-        token = auth_header.split(" ", 1)[1].strip()
+        token = auth_header[BEARER_PREFIX_LEN:].strip()
         try:
             payload = verify_access_token(token)
         except ValueError as e:
@@ -42,14 +54,15 @@ def login():
     data = request.get_json() or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password", "")
-    print(password)
 
     if not email or not password:
         return response(False, "email and password are required"), 400
 
-    try:
-        admin = CollegeAdmin.objects.get(email=email)
-    except DoesNotExist:
+    # project to what login reads (email is unique-indexed)
+    admin = CollegeAdmin.objects(email=email).only(
+        "id", "name", "email", "phone", "password", "is_first_login"
+    ).first()
+    if not admin:
         return response(False, "invalid credentials"), 401
 
     # Password verification
@@ -62,21 +75,20 @@ def login():
 
     if not password_ok:
         if admin.password and admin.password == password:
-            admin.password = generate_password_hash(password)
-            admin.save()
+            _rehash_executor.submit(_rehash_and_save, admin.id, password)
             password_ok = True
 
     if not password_ok:
         return response(False, "invalid credentials"), 401
 
-    college = College.objects(admins=admin).first()
+    college = College.objects(admins=admin.id).only("id", "name", "college_id").first()
     if not college:
         return response(False, "no college associated with this admin"), 400
 
     first_time = bool(getattr(admin, "is_first_login", False))
     if first_time:
-        admin.is_first_login = False
-        admin.save()
+        # single-field update; no full-document save
+        CollegeAdmin.objects(id=admin.id).update_one(set__is_first_login=False)
 
     payload = {
         "admin_id": str(admin.id),
@@ -135,13 +147,12 @@ def change_password():
     if not admin_id:
         return response(False, "token missing admin_id"), 401
 
-    try:
-        admin = CollegeAdmin.objects.get(id=admin_id)
-    except DoesNotExist:
+    # write the two fields directly; no need to load the admin first
+    updated = CollegeAdmin.objects(id=admin_id).update_one(
+        set__password=hash_password(new_password),
+        set__is_first_login=False,
+    )
+    if not updated:
         return response(False, "admin not found"), 404
 
-    admin.password = generate_password_hash(new_password)
-    admin.is_first_login = False
-    admin.save()
-
     return response(True, "password changed successfully"), 200
@@ -1,13 +1,50 @@
-import os, secrets, string
+import os, re, secrets, string, time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify, current_app
-from models.student import Student
+from models.student import Student, SEARCH_FIELDS
 from mongoengine.errors import NotUniqueError, ValidationError, FieldDoesNotExist
-from tasks.mail_tasks import send_mail
-from utils.response import response
-from utils.jwt import create_access_token, verify_access_token
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from utils.passwords import hash_password
+from tasks.mail_tasks import send_mail, send_mail_bulk
+from utils.response import response, json_stream_response
+from utils.jwt import create_access_token, verify_access_token, BEARER_PREFIX, BEARER_PREFIX_LEN
 from models.college import College
 bp = Blueprint("students_bp", __name__, url_prefix="/students")
 
+# Caller's college as (id, name): that's all these routes read. Cached per process
+# since it's resolved on every request and a college's name rarely changes. Colleges are
+# not edited through this app, so nothing invalidates an entry: a rename/delete made
+# elsewhere shows up once the short TTL runs out.
+CollegeRef = namedtuple("CollegeRef", ["id", "name"])
+_COLLEGE_CACHE_TTL_SECONDS = 60
+_COLLEGE_CACHE_MAX = 1024
+_college_cache = {}  # college_id -> (expires_at, CollegeRef)
+
+
+def _get_college_min(college_id):
+    """
+    CollegeRef for `college_id`, fetching only the name on a miss.
+    Raises College.DoesNotExist / ValidationError like College.objects.get().
+    """
+    now = time.monotonic()
+    hit = _college_cache.get(college_id)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+
+    doc = College.objects(id=college_id).only("name").as_pymongo().first()
+    if doc is None:
+        raise College.DoesNotExist(f"College {college_id} not found")
+
+    if len(_college_cache) >= _COLLEGE_CACHE_MAX:
+        _college_cache.clear()
+    ref = CollegeRef(doc["_id"], doc.get("name"))
+    _college_cache[college_id] = (now + _COLLEGE_CACHE_TTL_SECONDS, ref)
+    return ref
+
+
 def token_required(f):
     """Decorator to protect routes using Authorization: Bearer <token>"""
     from functools import wraps
@@ -15,10 +52,10 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_header = request.headers.get("Authorization", None)
-        if not auth_header or not auth_header.startswith("Bearer "):
+        if not auth_header or not auth_header.startswith(BEARER_PREFIX):
             return response(False, "Authorization header missing or malformed"), 401
 
-        token = auth_header.split(" ", 1)[1].strip()
+        token = auth_header[BEARER_PREFIX_LEN:].strip()
         try:
             payload = verify_access_token(token)
         except ValueError as e:
@@ -30,38 +67,175 @@ def token_required(f):
 
     return decorated
 
-def generate_password(length=12):
-    alphabet = string.ascii_letters + string.digits + "!@#$%&*?"
-    while True:
-        pwd = ''.join(secrets.choice(alphabet) for _ in range(length))
-        if (any(c.islower() for c in pwd)
-            and any(c.isupper() for c in pwd)
-            and any(c.isdigit() for c in pwd)
-            and any(c in "!@#$%&*?" for c in pwd)):
-            return pwd
+_PASSWORD_CLASSES = (string.ascii_lowercase, string.ascii_uppercase, string.digits, "!@#$%&*?")
+_PASSWORD_ALPHABET = "".join(_PASSWORD_CLASSES)
+_sysrandom = secrets.SystemRandom()
 
-def build_email(student, plain_password):
-    url = os.getenv("APP_URL", "https://deloai.com")
-    subject = "Your DeloAI account credentials"
-    html = f"""
-    <p>Hi {student.name},</p>
+
+def generate_password(length=12):
+    # one draw for the whole password, then one char of each class at a random slot:
+    # the policy holds by construction, no generate-and-retry loop
+    pwd = _sysrandom.choices(_PASSWORD_ALPHABET, k=length - len(_PASSWORD_CLASSES))
+    pwd += [_sysrandom.choice(cls) for cls in _PASSWORD_CLASSES]
+    _sysrandom.shuffle(pwd)
+    return "".join(pwd)
+
+# credentials email, compiled once
+_CREDENTIALS_SUBJECT = "Your DeloAI account credentials"
+_CREDENTIALS_HTML = string.Template("""
+    <p>Hi $name,</p>
     <p>Your student account has been created.</p>
-    <p><b>Login:</b> <a href="{url}">{url}</a></p>
-    <p><b>USN:</b> {getattr(student, 'usn', '')}<br>
-       <b>Email:</b> {student.email}<br>
-       <b>Password:</b> {plain_password}</p>
+    <p><b>Login:</b> <a href="$url">$url</a></p>
+    <p><b>USN:</b> $usn<br>
+       <b>Email:</b> $email<br>
+       <b>Password:</b> $password</p>
     <p>Please login and change your password.</p>
-    """
-    text = f"""Hi {student.name},
+    """)
+_CREDENTIALS_TEXT = string.Template("""Hi $name,
 
-Login: {url}
-USN: {getattr(student, 'usn', '')}
-Email: {student.email}
-Password: {plain_password}
+Login: $url
+USN: $usn
+Email: $email
+Password: $password
 
 Please login and change your password.
-"""
-    return subject, html, text
+""")
+
+
+def build_email(student, plain_password):
+    return _render_credentials(student.name, getattr(student, 'usn', ''), student.email, plain_password)
+
+
+def _render_credentials(name, usn, email, plain_password):
+    values = {
+        "name": name,
+        "url": os.getenv("APP_URL", "https://deloai.com"),
+        "usn": usn,
+        "email": email,
+        "password": plain_password,
+    }
+    return _CREDENTIALS_SUBJECT, _CREDENTIALS_HTML.substitute(values), _CREDENTIALS_TEXT.substitute(values)
+
+
+def _credentials_mail(doc, plain_password):
+    """send_mail kwargs for a new student's credentials email, from its stored document."""
+    subject, html, text = _render_credentials(doc["name"], doc.get("usn"), doc["email"], plain_password)
+    return {"to": [doc["email"]], "subject": subject, "html": html, "text": text}
+
+
+# fallback for a plain (non-task) send_mail, so SMTP never runs inside a request
+_mail_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mail")
+
+
+def _queue_mails(mails):
+    """
+    Hand all mails of a bulk request to send_mail_bulk in one publish
+    (instead of one send_mail.delay per row). Returns the exception on failure, else None.
+    """
+    if not mails:
+        return None
+    try:
+        if hasattr(send_mail_bulk, "delay"):
+            send_mail_bulk.delay(mails)
+        else:
+            send_mail_bulk(mails)
+    except Exception as e:
+        return e
+    return None
+
+# bulk routes hash many passwords per request; hashlib.scrypt releases the GIL,
+# so a thread pool spreads the KDF work over the cores
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="pw-hash")
+
+
+def _new_credentials(n):
+    """n fresh (plain password, hash) pairs; hashing runs on _hash_pool."""
+    plains = [generate_password(12) for _ in range(n)]
+    if n <= 1:
+        return [(p, hash_password(p)) for p in plains]
+    return list(zip(plains, _hash_pool.map(hash_password, plains)))
+
+
+# fields add_bulk_students copies from each input row
+_BULK_CREATE_FIELDS = (
+    "name", "gender", "date_of_birth", "email", "phone_number",
+    "usn", "enrollment_number", "branch", "year_of_study", "semester",
+    "cgpa", "address", "city", "state", "pincode",
+    "guardian_name", "guardian_contact",
+)
+
+def _classify_create_row(sd):
+    """
+    Check one add_bulk_students row without touching the database.
+    Returns (Student kwargs, None), or (None, result fields) for a rejected row.
+    """
+    # normalize dict-like input
+    if not isinstance(sd, dict):
+        return None, {"status": "error", "message": "Invalid item (expected object/dict)."}
+
+    name = sd.get("name") or sd.get("first_name") or sd.get("full_name")
+    email = sd.get("email")
+    # Name and email mandatory for creation per user's requirement
+    if not name or not email:
+        return None, {
+            "status": "skipped",
+            "message": "Missing required field(s): name and email are required.",
+            "provided": {"name": name, "email": email}
+        }
+
+    # only set fields that exist on the model
+    return {key: sd[key] for key in _BULK_CREATE_FIELDS if sd.get(key) is not None}, None
+
+
+def _classify_upsert_row(item, primary_field):
+    """
+    Check one upsert_bulk_students row without touching the database.
+    Returns (primary value, None), or (None, result fields) for a rejected row.
+    """
+    if not isinstance(item, dict):
+        return None, {"status": "error", "message": "Invalid item (expected object/dict)."}
+
+    primary_value = item.get(primary_field)
+    if not primary_value:
+        return None, {
+            "status": "skipped",
+            "message": f"Missing primary field '{primary_field}'",
+            "provided": item
+        }
+    if not isinstance(primary_value, (str, int)):
+        return None, {
+            "primary": {primary_field: primary_value},
+            "status": "error",
+            "message": f"Invalid identifier or query error: '{primary_field}' must be a string"
+        }
+    return primary_value, None
+
+
+# Student fields under a unique index
+_UNIQUE_FIELDS = ("email", "usn", "enrollment_number")
+
+
+def _existing_unique_values(rows):
+    """
+    {field: set of values already stored} for the _UNIQUE_FIELDS values in `rows`
+    (dicts), fetched with a single $or/$in query.
+    """
+    wanted = {f: set() for f in _UNIQUE_FIELDS}
+    for row in rows:
+        for f in _UNIQUE_FIELDS:
+            if isinstance(row.get(f), str):
+                wanted[f].add(row[f])
+
+    taken = {f: set() for f in _UNIQUE_FIELDS}
+    clauses = [{f: {"$in": list(vals)}} for f, vals in wanted.items() if vals]
+    if clauses:
+        projection = {f: 1 for f in _UNIQUE_FIELDS}
+        for doc in Student._get_collection().find({"$or": clauses}, projection):
+            for f in _UNIQUE_FIELDS:
+                if doc.get(f) in wanted[f]:
+                    taken[f].add(doc[f])
+    return taken
+
 
 @bp.route('/add-bulk-students', methods=["POST"])
 @token_required
@@ -80,7 +254,7 @@ def add_bulk_students():
 
     # resolve college
     try:
-        college = College.objects.get(id=college_id)
+        college = _get_college_min(college_id)
     except College.DoesNotExist:
         return response(False, "College not found"), 404
     except ValidationError:
@@ -88,84 +262,46 @@ def add_bulk_students():
 
     results = []
     created_count = 0
+    # rows with name+email: (input index, Student kwargs)
+    candidates = []
+    # candidates without a unique-value clash
+    fresh = []
+    # validated rows as raw documents, inserted together below: (input index, document, plain password)
+    pending = []
 
     for idx, sd in enumerate(students_data):
-        # normalize dict-like input
-        if not isinstance(sd, dict):
-            results.append({"index": idx, "status": "error", "message": "Invalid item (expected object/dict)."})
+        student_kwargs, error = _classify_create_row(sd)
+        if error:
+            results.append({"index": idx, **error})
             continue
+        student_kwargs["college"] = college.id
+        candidates.append((idx, student_kwargs))
 
-        name = sd.get("name") or sd.get("first_name") or sd.get("full_name")
-        email = sd.get("email")
-        # Name and email mandatory for creation per user's requirement
-        if not name or not email:
+    # one $in lookup for values that already exist under a unique index, so those rows
+    # are rejected up front instead of being hashed and then failing in insert_many
+    taken = _existing_unique_values(kw for _, kw in candidates)
+
+    for idx, student_kwargs in candidates:
+        clash = next((f for f in _UNIQUE_FIELDS if student_kwargs.get(f) in taken[f]), None)
+        if clash:
             results.append({
                 "index": idx,
-                "status": "skipped",
-                "message": "Missing required field(s): name and email are required.",
-                "provided": {"name": name, "email": email}
+                "status": "error",
+                "message": f"Unique constraint error: {clash} '{student_kwargs[clash]}' already exists"
             })
             continue
 
-        # prepare fields to set - make sure we only set fields that exist on the model
-        allowed_fields = [
-            "name", "gender", "date_of_birth", "email", "phone_number",
-            "usn", "enrollment_number", "branch", "year_of_study", "semester",
-            "cgpa", "address", "city", "state", "pincode",
-            "guardian_name", "guardian_contact"
-        ]
-        student_kwargs = {"college": college.id}
-        for key in allowed_fields:
-            if key in sd and sd.get(key) is not None:
-                student_kwargs[key] = sd.get(key)
+        fresh.append((idx, student_kwargs))
 
-        # create student instance
+    # passwords for all new students, hashed in parallel
+    credentials = _new_credentials(len(fresh))
+    for (idx, student_kwargs), (plain_password, password_hash) in zip(fresh, credentials):
+        # build + validate now (what save() would check); from here on the row is a plain
+        # dict for the collection API, and the insert happens once for all rows
         try:
-            plain_password = generate_password(12)
-            student = Student(**student_kwargs)
-            # set password (hashes internally)
-            student.set_password(plain_password)
-            # ensure required model fields exist - Student.name and Student.email are required by your model
-            # Save
-            student.save()
-
-            # send email (Celery style if available)
-            subject, html, text = build_email(student, plain_password)
-            try:
-                # prefer async task if present
-                if hasattr(send_mail, "delay"):
-                    send_mail.delay(to=[student.email], subject=subject, html=html, text=text)
-                else:
-                    send_mail(to=[student.email], subject=subject, html=html, text=text)
-            except Exception as mail_exc:
-                # email failure should not mark student creation as failed
-                results.append({
-                    "index": idx,
-                    "status": "created_email_failed",
-                    "message": f"Student created but email sending failed: {str(mail_exc)}",
-                    "student_id": str(student.id),
-                    "email": student.email
-                })
-                created_count += 1
-                continue
-
-            results.append({
-                "index": idx,
-                "status": "created",
-                "message": "Student created and email scheduled/sent.",
-                "student_id": str(student.id),
-                "email": student.email
-            })
-            created_count += 1
-
-        except NotUniqueError as e:
-            # check which field likely violated uniqueness
-            err_msg = str(e)
-            results.append({
-                "index": idx,
-                "status": "error",
-                "message": f"Unique constraint error: {err_msg}"
-            })
+            student = Student(password_hash=password_hash, **student_kwargs)
+            student.validate()
+            pending.append((idx, student.to_mongo().to_dict(), plain_password))
         except ValidationError as e:
             results.append({
                 "index": idx,
@@ -179,6 +315,51 @@ def add_bulk_students():
                 "message": f"Unexpected error: {str(e)}"
             })
 
+    # one unordered insert_many for every valid row; failures (e.g. duplicate email/usn)
+    # come back per document in writeErrors while the rest are inserted
+    failed = {}
+    mails = []
+    created = []
+    if pending:
+        docs = [doc for _, doc, _ in pending]
+        try:
+            Student._get_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed[err["index"]] = err
+        except Exception as e:
+            failed = {i: {"errmsg": f"Unexpected error: {str(e)}"} for i in range(len(docs))}
+
+        for pos, (idx, doc, plain_password) in enumerate(pending):
+            err = failed.get(pos)
+            if err is not None:
+                prefix = "Unique constraint error: " if err.get("code") == 11000 else ""
+                results.append({"index": idx, "status": "error", "message": f"{prefix}{err.get('errmsg')}"})
+                continue
+
+            created_count += 1
+            mails.append(_credentials_mail(doc, plain_password))
+            created.append({
+                "index": idx,
+                "status": "created",
+                "message": "Student created and email scheduled/sent.",
+                "student_id": str(doc["_id"]),  # set by insert_many
+                "email": doc["email"]
+            })
+
+    # all credential mails in one task publish
+    mail_exc = _queue_mails(mails)
+    if mail_exc is not None:
+        # email failure should not mark student creation as failed
+        for row in created:
+            row["status"] = "created_email_failed"
+            row["message"] = f"Student created but email sending failed: {str(mail_exc)}"
+    results.extend(created)
+
+    results.sort(key=lambda r: r["index"])
+    if created_count:
+        invalidate_filters_meta(college.id)
+
     return jsonify({
         "success": True,
         "college": {"id": str(college.id), "name": college.name},
@@ -222,7 +403,7 @@ def upsert_bulk_students():
 
     # resolve college
     try:
-        college = College.objects.get(id=college_id)
+        college = _get_college_min(college_id)
     except College.DoesNotExist:
         return response(False, "College not found"), 404
     except ValidationError:
@@ -239,157 +420,185 @@ def upsert_bulk_students():
     updated_count = 0
     created_count = 0
 
+    # first pass: validate rows and collect primary values
+    rows = []  # (idx, item, primary_value)
     for idx, item in enumerate(students_items):
-        if not isinstance(item, dict):
-            results.append({"index": idx, "status": "error", "message": "Invalid item (expected object/dict)."})
+        primary_value, error = _classify_upsert_row(item, primary_field)
+        if error:
+            results.append({"index": idx, **error})
             continue
-
-        primary_value = item.get(primary_field)
-        if not primary_value:
+        rows.append((idx, item, primary_value))
+
+    # one query: which primary values already exist in this college (value -> _id)
+    coll = Student._get_collection()
+    existing = {}
+    if rows:
+        cursor = coll.find(
+            {primary_field: {"$in": list({v for _, _, v in rows})}, "college": college.id},
+            {primary_field: 1},
+        )
+        existing = {d[primary_field]: d["_id"] for d in cursor}
+
+    # second pass: one UpdateOne per row, sent in a single bulk_write
+    ops = []
+    op_rows = []  # parallel to ops: (idx, primary_value, new document or None, plain_password or None)
+    creates = []  # rows to create, built once their passwords are hashed
+    for idx, item, primary_value in rows:
+        # Build update dict (skip changing primary field itself to avoid accidental key clash)
+        # prepare_query_value applies the same conversion as Student.objects(...).update(set__x=...)
+        try:
+            set_updates = {}
+            for key in allowed_fields:
+                if key == primary_field:
+                    continue
+                if key in item and item.get(key) is not None:
+                    set_updates[key] = Student._fields[key].prepare_query_value("set", item.get(key))
+        except Exception as e:
             results.append({
                 "index": idx,
-                "status": "skipped",
-                "message": f"Missing primary field '{primary_field}'",
-                "provided": item
+                "primary": {primary_field: primary_value},
+                "status": "error",
+                "message": f"Invalid identifier or query error: {str(e)}"
             })
             continue
 
-        # Build update dict (skip changing primary field itself to avoid accidental key clash)
-        set_updates = {}
-        for key in allowed_fields:
-            if key == primary_field:
-                continue
-            if key in item and item.get(key) is not None:
-                set_updates[f"set__{key}"] = item.get(key)
-
-        # Try find student scoped to college
-        try:
-            query = {primary_field: primary_value, "college": college}
-            student_qs = Student.objects(**query)
-
-            if student_qs.count() > 0:
-                # Student exists => update
-                if set_updates:
-                    try:
-                        student_qs.update(**set_updates)
-                        student_after = Student.objects(**query).first()
-                        results.append({
-                            "index": idx,
-                            "primary": {primary_field: primary_value},
-                            "status": "updated",
-                            "student_id": str(student_after.id) if student_after else None
-                        })
-                        updated_count += 1
-                    except NotUniqueError as e:
-                        results.append({
-                            "index": idx,
-                            "primary": {primary_field: primary_value},
-                            "status": "error",
-                            "message": f"Unique constraint error during update: {str(e)}"
-                        })
-                else:
-                    results.append({
-                        "index": idx,
-                        "primary": {primary_field: primary_value},
-                        "status": "skipped",
-                        "message": "No updatable fields present."
-                    })
-                continue
+        set_updates.update(Student.search_shadow(set_updates))
+        query = {primary_field: primary_value, "college": college.id}
 
-            # Not found -> create new Student
-            # Ensure required fields (name and email) exist; for creation we require name and email per your add route.
-            # If primary field is email, email is present. If primary is usn/enrollment_number and email missing, creation will be skipped.
-            name = item.get("name") or item.get("first_name") or item.get("full_name")
-            email = item.get("email")
-            if not name or not email:
+        if primary_value in existing:
+            # Student exists => update
+            if not set_updates:
                 results.append({
                     "index": idx,
                     "primary": {primary_field: primary_value},
                     "status": "skipped",
-                    "message": "Missing required field(s) for creation: name and email are required.",
-                    "provided": item
+                    "message": "No updatable fields present."
                 })
                 continue
+            ops.append(UpdateOne(query, {"$set": set_updates}))
+            op_rows.append((idx, primary_value, None, None))
+            continue
 
-            # prepare kwargs for new student
-            student_kwargs = {"college": college}
-            for key in allowed_fields:
-                if key in item and item.get(key) is not None:
-                    student_kwargs[key] = item.get(key)
-
-            # If primary_field wasn't included in allowed_fields (it is), ensure it's set
-            if primary_field not in student_kwargs and primary_value:
-                student_kwargs[primary_field] = primary_value
-
-            try:
-                plain_password = generate_password(12)
-                student = Student(**student_kwargs)
-                student.set_password(plain_password)
-                student.save()  # persist
-
-                # send email (celery or direct)
-                subject, html, text = build_email(student, plain_password)
-                try:
-                    if hasattr(send_mail, "delay"):
-                        send_mail.delay(to=[student.email], subject=subject, html=html, text=text)
-                    else:
-                        send_mail(to=[student.email], subject=subject, html=html, text=text)
-                    results.append({
-                        "index": idx,
-                        "primary": {primary_field: primary_value},
-                        "status": "created",
-                        "student_id": str(student.id),
-                        "email": student.email
-                    })
-                    created_count += 1
-                except Exception as mail_exc:
-                    # Creation succeeded but email failed
-                    results.append({
-                        "index": idx,
-                        "primary": {primary_field: primary_value},
-                        "status": "created_email_failed",
-                        "student_id": str(student.id),
-                        "email": student.email,
-                        "message": f"Student created but email sending failed: {str(mail_exc)}"
-                    })
-                    created_count += 1
-
-            except NotUniqueError as e:
-                results.append({
-                    "index": idx,
-                    "primary": {primary_field: primary_value},
-                    "status": "error",
-                    "message": f"Unique constraint error during create: {str(e)}"
-                })
-            except ValidationError as e:
-                results.append({
-                    "index": idx,
-                    "primary": {primary_field: primary_value},
-                    "status": "error",
-                    "message": f"Validation error during create: {str(e)}"
-                })
-            except Exception as e:
-                results.append({
-                    "index": idx,
-                    "primary": {primary_field: primary_value},
-                    "status": "error",
-                    "message": f"Unexpected error during create: {str(e)}"
-                })
+        # Not found -> create new Student
+        # Ensure required fields (name and email) exist; for creation we require name and email per your add route.
+        # If primary field is email, email is present. If primary is usn/enrollment_number and email missing, creation will be skipped.
+        name = item.get("name") or item.get("first_name") or item.get("full_name")
+        email = item.get("email")
+        if not name or not email:
+            results.append({
+                "index": idx,
+                "primary": {primary_field: primary_value},
+                "status": "skipped",
+                "message": "Missing required field(s) for creation: name and email are required.",
+                "provided": item
+            })
+            continue
 
+        # prepare kwargs for new student
+        student_kwargs = {"college": college.id}
+        for key in allowed_fields:
+            if key in item and item.get(key) is not None:
+                student_kwargs[key] = item.get(key)
+
+        # If primary_field wasn't included in allowed_fields (it is), ensure it's set
+        if primary_field not in student_kwargs and primary_value:
+            student_kwargs[primary_field] = primary_value
+
+        creates.append((idx, primary_value, student_kwargs, set_updates, query))
+
+    # passwords for all new students, hashed in parallel
+    credentials = _new_credentials(len(creates))
+    for (idx, primary_value, student_kwargs, set_updates, query), (plain_password, password_hash) in zip(creates, credentials):
+        try:
+            student = Student(password_hash=password_hash, **student_kwargs)
+            student.validate()
         except ValidationError as e:
             results.append({
                 "index": idx,
                 "primary": {primary_field: primary_value},
                 "status": "error",
-                "message": f"Invalid identifier or query error: {str(e)}"
+                "message": f"Validation error during create: {str(e)}"
             })
+            continue
         except Exception as e:
             results.append({
                 "index": idx,
                 "primary": {primary_field: primary_value},
                 "status": "error",
-                "message": f"Unexpected error: {str(e)}"
+                "message": f"Unexpected error during create: {str(e)}"
             })
+            continue
+
+        # upsert: the full document only lands if nobody created the student concurrently;
+        # upserted_ids tells which rows really were created (and need credentials)
+        doc = student.to_mongo().to_dict()
+        on_insert = {k: v for k, v in doc.items() if k not in set_updates}
+        update = {"$setOnInsert": on_insert}
+        if set_updates:
+            update["$set"] = set_updates
+        ops.append(UpdateOne(query, update, upsert=True))
+        op_rows.append((idx, primary_value, doc, plain_password))
+
+    failed = {}
+    upserted = {}
+    mails = []
+    created = []
+    if ops:
+        try:
+            result = coll.bulk_write(ops, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed[err["index"]] = err
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+        except Exception as e:
+            failed = {i: {"errmsg": f"Unexpected error: {str(e)}"} for i in range(len(ops))}
+
+    for pos, (idx, primary_value, doc, plain_password) in enumerate(op_rows):
+        primary = {primary_field: primary_value}
+        err = failed.get(pos)
+        if err is not None:
+            stage = "update" if doc is None else "create"
+            if err.get("code") == 11000:
+                message = f"Unique constraint error during {stage}: {err.get('errmsg')}"
+            else:
+                message = err.get("errmsg")
+            results.append({"index": idx, "primary": primary, "status": "error", "message": message})
+            continue
+
+        if pos not in upserted:
+            # matched an existing student (possibly created concurrently)
+            results.append({
+                "index": idx,
+                "primary": primary,
+                "status": "updated",
+                "student_id": str(existing[primary_value]) if primary_value in existing else None
+            })
+            updated_count += 1
+            continue
+
+        created_count += 1
+        mails.append(_credentials_mail(doc, plain_password))
+        created.append({
+            "index": idx,
+            "primary": primary,
+            "status": "created",
+            "student_id": str(upserted[pos]),
+            "email": doc["email"]
+        })
+
+    # all credential mails in one task publish
+    mail_exc = _queue_mails(mails)
+    if mail_exc is not None:
+        # Creation succeeded but email failed
+        for row in created:
+            row["status"] = "created_email_failed"
+            row["message"] = f"Student created but email sending failed: {str(mail_exc)}"
+    results.extend(created)
+
+    results.sort(key=lambda r: r["index"])
+    if created_count or updated_count:
+        invalidate_filters_meta(college.id)
 
     return jsonify({
         "success": True,
@@ -406,6 +615,64 @@ from flask import request, jsonify
 from mongoengine import ValidationError
 # no changes to token_required; reuse existing decorator
 
+def _field_default(name):
+    default = Student._fields[name].default
+    return default() if callable(default) else default
+
+
+# list_students filters_meta per college; branches/years/genders change far less often
+# than the list is viewed. Writes in this module drop the college's entry.
+_FILTERS_META_TTL_SECONDS = 60
+_FILTERS_META_MAX = 1024
+_filters_meta_cache = {}  # college ObjectId -> (expires_at, filters_meta)
+_FILTERS_META_FIELDS = {"years": "year_of_study", "genders": "gender", "branches": "branch"}
+
+
+def _get_filters_meta(college_oid):
+    """Value counts of year_of_study/gender/branch in a college, cached for a minute."""
+    now = time.monotonic()
+    hit = _filters_meta_cache.get(college_oid)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+
+    # value counts for all three fields in one $facet aggregation
+    # (was distinct() + one count() per value, per field)
+    facets = next(Student._get_collection().aggregate([
+        {"$match": {"college": college_oid}},
+        {"$facet": {
+            key: [
+                {"$match": {field: {"$exists": True}}},  # distinct() ignores docs without the field
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            ]
+            for key, field in _FILTERS_META_FIELDS.items()
+        }},
+    ]), {})
+
+    def _distinct_counts(key):
+        out = [{"value": r["_id"], "count": r["count"]} for r in facets.get(key, [])]
+        return sorted(out, key=lambda x: (x["value"] is None or x["value"] == "", str(x["value"])))
+
+    meta = {key: _distinct_counts(key) for key in _FILTERS_META_FIELDS}
+    if len(_filters_meta_cache) >= _FILTERS_META_MAX:
+        _filters_meta_cache.clear()
+    _filters_meta_cache[college_oid] = (now + _FILTERS_META_TTL_SECONDS, meta)
+    return meta
+
+
+def invalidate_filters_meta(college_oid):
+    """Drop a college's cached filters_meta after its students change."""
+    _filters_meta_cache.pop(college_oid, None)
+
+
+# list_students row defaults for fields absent from a stored document
+_LIST_DEFAULTS = {f: _field_default(f) for f in (
+    "name", "email", "phone_number", "usn", "enrollment_number",
+    "branch", "year_of_study", "semester", "cgpa", "gender", "is_active",
+    "first_time_login", "address", "city", "state", "pincode",
+    "guardian_name", "guardian_contact",
+)}
+
+
 @bp.route('/list', methods=['GET'])
 @token_required
 def list_students():
@@ -414,7 +681,8 @@ def list_students():
     Query params (all optional):
       - page (int, default=1)
       - per_page (int, default=20, max=100)
-      - search (string)
+      - search (string; case-insensitive prefix of name/email/usn/enrollment_number)
+      - search_mode ("contains" for a substring match instead of prefix; slower, unindexed)
       - year_of_study (int or comma separated list)
       - gender (string or comma separated list)
       - branch (string or comma separated list)
@@ -446,11 +714,10 @@ def list_students():
     search = (request.args.get("search") or "").strip()
     sort_by = request.args.get("sort_by", "name")
     sort_dir = (request.args.get("sort_dir", "asc") or "asc").lower()
-    sort_prefix = "" if sort_dir == "asc" else "-"
 
     # resolve college
     try:
-        college = College.objects.get(id=college_id)
+        college = _get_college_min(college_id)
     except College.DoesNotExist:
         return response(False, "College not found"), 404
     except ValidationError:
@@ -511,17 +778,17 @@ def list_students():
             mongo_raw_query[k] = v
 
     if search:
-        or_clauses = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}},
-            {"usn": {"$regex": search, "$options": "i"}},
-            {"enrollment_number": {"$regex": search, "$options": "i"}},
-        ]
+        if request.args.get("search_mode") == "contains":
+            # substring match anywhere: case-insensitive regex, cannot use an index
+            pattern = {"$regex": re.escape(search), "$options": "i"}
+            or_clauses = [{f: pattern} for f in SEARCH_FIELDS]
+        else:
+            # default: prefix match on the lowercase shadows -> (college, <field>_lc) index ranges
+            pattern = {"$regex": "^" + re.escape(search.lower())}
+            or_clauses = [{f"{f}_lc": pattern} for f in SEARCH_FIELDS]
         mongo_raw_query = {"$and": [mongo_raw_query, {"$or": or_clauses}]}
 
     # total + pagination
-    total = Student.objects(__raw__=mongo_raw_query).count()
-    total_pages = ceil(total / per_page) if per_page else 1
     skip = (page - 1) * per_page
     allowed_fields = [
         "id", "name", "email", "phone_number", "usn", "enrollment_number",
@@ -532,27 +799,31 @@ def list_students():
 
     if sort_by not in allowed_fields and sort_by not in ("created_at", "updated_at"):
         sort_by = "name"
-    sort_arg = f"{sort_prefix}{sort_by}"
-
-    qs = Student.objects(__raw__=mongo_raw_query).order_by(sort_arg).skip(skip).limit(per_page)
+    sort_field = "_id" if sort_by == "id" else sort_by
+
+    # page as a find so $sort can walk the (college, <sort field>) index; a $sort inside
+    # $facet is always an in-memory sort of the whole matched set. Rows projected to allowed_fields
+    coll = Student._get_collection()
+    rows = list(
+        coll.find(mongo_raw_query, {f: 1 for f in allowed_fields if f != "id"})
+        .sort(sort_field, 1 if sort_dir == "asc" else -1)
+        .skip(skip)
+        .limit(per_page)
+    )
+    total = coll.count_documents(mongo_raw_query)
+    total_pages = ceil(total / per_page) if per_page else 1
 
+    # rows straight from the projected dicts (no Student hydration);
+    # missing fields fall back to the model defaults, as attribute access did
+    # built before the 200 goes out so a bad row fails the request, not the body mid-stream
     students = []
-    for s in qs:
-        row = {}
-        for f in allowed_fields:
-            row[f if f != "id" else "id"] = str(getattr(s, "id")) if f == "id" else getattr(s, f, None)
+    for doc in rows:
+        row = {"id": str(doc["_id"])}
+        for f in allowed_fields[1:]:
+            row[f] = doc.get(f, _LIST_DEFAULTS[f])
         students.append(row)
 
-    # filters_meta (can use model objects safely here)
-    def _distinct_counts(field):
-        vals = Student.objects(college=college).distinct(field)
-        out = []
-        for v in vals:
-            count = Student.objects(college=college, **{field: v}).count()
-            out.append({"value": v, "count": count})
-        return sorted(out, key=lambda x: (x["value"] is None or x["value"] == "", str(x["value"])))
-
-    return jsonify({
+    return json_stream_response({
         "success": True,
         "college": {"id": str(college.id), "name": college.name},
         "students": students,
@@ -560,12 +831,8 @@ def list_students():
             "total": total, "page": page, "per_page": per_page,
             "total_pages": total_pages, "sort_by": sort_by, "sort_dir": sort_dir
         },
-        "filters_meta": {
-            "years": _distinct_counts("year_of_study"),
-            "genders": _distinct_counts("gender"),
-            "branches": _distinct_counts("branch")
-        }
-    }), 200
+        "filters_meta": _get_filters_meta(college_oid)
+    }, "students"), 200
 
 
 
@@ -590,15 +857,13 @@ def get_student_by_id(student_id):
     if not college_id:
         return response(False, "College ID missing in token"), 400
 
-    try:
-        college = College.objects.get(id=college_id)
-    except College.DoesNotExist:
-        return response(False, "College not found"), 404
-    except ValidationError:
+    # the token already vouches for the college: use its id as-is, no College lookup
+    if not ObjectId.is_valid(college_id):
         return response(False, "Invalid College ID"), 400
+    college_oid = ObjectId(college_id)
 
     try:
-        student = Student.objects.get(id=student_id, college=college)
+        student = Student.objects.get(id=student_id, college=college_oid)
     except (Student.DoesNotExist, DoesNotExist):
         return response(False, "Student not found"), 404
     except ValidationError:
@@ -629,39 +894,43 @@ def update_student_by_id(student_id):
     if not college_id:
         return response(False, "College ID missing in token"), 400
 
-    try:
-        college = College.objects.get(id=college_id)
-    except College.DoesNotExist:
-        return response(False, "College not found"), 404
-    except ValidationError:
+    if not ObjectId.is_valid(college_id):
         return response(False, "Invalid College ID"), 400
+    college_oid = ObjectId(college_id)
 
     data = request.get_json(force=True, silent=True) or {}
     if not isinstance(data, dict) or len(data) == 0:
         return response(False, "No update fields provided"), 400
 
-    # build update kwargs using mongoengine update syntax (set__field)
-    update_kwargs = {}
-    for k, v in data.items():
-        if k in UPDATE_ALLOWED:
-            update_kwargs[f"set__{k}"] = v
-
-    if not update_kwargs:
+    # build the $set; prepare_query_value converts/validates like QuerySet.update(set__field=...)
+    updates = {k: v for k, v in data.items() if k in UPDATE_ALLOWED}
+    if not updates:
         return response(False, "No updatable fields present or fields not allowed."), 400
 
     try:
-        qs = Student.objects(id=student_id, college=college)
-        if qs.count() == 0:
+        if not ObjectId.is_valid(student_id):
+            raise ValidationError(f"'{student_id}' is not a valid ObjectId")
+        set_doc = {k: Student._fields[k].prepare_query_value("set", v) for k, v in updates.items()}
+        set_doc.update(Student.search_shadow(updates))
+
+        # match + update + read back in one round trip
+        doc = Student._get_collection().find_one_and_update(
+            {"_id": ObjectId(student_id), "college": college_oid},
+            {"$set": set_doc},
+            projection=UPDATE_ALLOWED,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
             return response(False, "Student not found"), 404
+        invalidate_filters_meta(college_oid)
 
-        qs.update(**update_kwargs)
-        student = Student.objects.get(id=student_id, college=college)
+        student = Student._from_son(doc)
         out = {"id": str(student.id)}
         for f in UPDATE_ALLOWED:
             out[f] = getattr(student, f, None)
         return jsonify({"success": True, "student": out, "message": "Student updated"}), 200
 
-    except NotUniqueError as e:
+    except (NotUniqueError, DuplicateKeyError) as e:
         return response(False, f"Unique constraint error during update: {str(e)}"), 400
     except ValidationError as e:
         return response(False, f"Validation error during update: {str(e)}"), 400
@@ -693,12 +962,9 @@ def change_password(student_id):
     if not college_id:
         return response(False, "College ID missing in token"), 400
 
-    try:
-        college = College.objects.get(id=college_id)
-    except College.DoesNotExist:
-        return response(False, "College not found"), 404
-    except ValidationError:
+    if not ObjectId.is_valid(college_id):
         return response(False, "Invalid College ID"), 400
+    college_oid = ObjectId(college_id)
 
     data = request.get_json(force=True, silent=True) or {}
     new_password = data.get("new_password")
@@ -707,30 +973,21 @@ def change_password(student_id):
     if not new_password:
         return response(False, "new_password is required"), 400
 
-    try:
-        student = Student.objects.get(id=student_id, college=college)
-    except (Student.DoesNotExist, DoesNotExist):
-        return response(False, "Student not found"), 404
-    except ValidationError:
+    if not ObjectId.is_valid(student_id):
         return response(False, "Invalid student id"), 400
-    except Exception as e:
-        return response(False, f"Unexpected error: {str(e)}"), 500
 
     # Determine permission: allow if caller is admin/manager OR caller is same student
-    is_same_student = False
-    try:
-        if caller_id and str(caller_id) == str(student.id):
-            is_same_student = True
-    except Exception:
-        is_same_student = False
+    is_same_student = bool(caller_id) and str(caller_id) == str(student_id)
 
-    
-
-    
     try:
-        student.set_password(new_password)
-        student.first_time_login = False
-        student.save()
+        # hash + first_time_login reset written in one round trip, no document load
+        doc = Student._get_collection().find_one_and_update(
+            {"_id": ObjectId(student_id), "college": college_oid},
+            {"$set": {"password_hash": hash_password(new_password), "first_time_login": False}},
+            projection={"_id": 1},
+        )
+        if doc is None:
+            return response(False, "Student not found"), 404
         return jsonify({"success": True, "message": "Password changed and first_time_login cleared."}), 200
     except ValidationError as e:
         return response(False, f"Validation error: {str(e)}"), 400
@@ -764,13 +1021,9 @@ def add_student():
     if not college_id:
         return response(False, "College ID missing in token"), 400
 
-    # resolve college
-    try:
-        college = College.objects.get(id=college_id)
-    except College.DoesNotExist:
-        return response(False, "College not found"), 404
-    except ValidationError:
+    if not ObjectId.is_valid(college_id):
         return response(False, "Invalid College ID"), 400
+    college_oid = ObjectId(college_id)
 
     data = request.get_json(force=True, silent=True) or {}
     if not isinstance(data, dict) or not data:
@@ -790,7 +1043,7 @@ def add_student():
         "guardian_name", "guardian_contact", "is_active", "first_time_login"
     ]
 
-    student_kwargs = {"college": college}
+    student_kwargs = {"college": college_oid}
     for key in allowed_fields:
         if key in data and data.get(key) is not None:
             student_kwargs[key] = data.get(key)
@@ -802,15 +1055,16 @@ def add_student():
         student = Student(**student_kwargs)
         student.set_password(plain_password)
         student.save()
+        invalidate_filters_meta(college_oid)
 
-        # send email (try async if available)
+        # send email off the request thread: Celery if available, else the local mail pool
         subject, html, text = build_email(student, plain_password)
         try:
             if hasattr(send_mail, "delay"):
                 send_mail.delay(to=[student.email], subject=subject, html=html, text=text)
             else:
-                send_mail(to=[student.email], subject=subject, html=html, text=text)
-            email_status = "email_scheduled_or_sent"
+                _mail_executor.submit(send_mail, to=[student.email], subject=subject, html=html, text=text)
+            email_status = "email_scheduled"
         except Exception as mail_exc:
             email_status = f"email_failed: {str(mail_exc)}"
 
@@ -850,29 +1104,26 @@ def delete_student(student_id):
     if not college_id:
         return response(False, "College ID missing in token"), 400
 
-
-    try:
-        college = College.objects.get(id=college_id)
-    except College.DoesNotExist:
-        return response(False, "College not found"), 404
-    except ValidationError:
+    if not ObjectId.is_valid(college_id):
         return response(False, "Invalid College ID"), 400
+    college_oid = ObjectId(college_id)
 
-    try:
-        student = Student.objects.get(id=student_id, college=college)
-    except (Student.DoesNotExist, DoesNotExist):
-        return response(False, "Student not found"), 404
-    except ValidationError:
+    if not ObjectId.is_valid(student_id):
         return response(False, "Invalid student id"), 400
-    except Exception as e:
-        return response(False, f"Unexpected error: {str(e)}"), 500
 
+    # no existence probe: the delete itself reports whether the student was there
     try:
-        student.delete()
+        doc = Student._get_collection().find_one_and_delete(
+            {"_id": ObjectId(student_id), "college": college_oid},
+            projection={"name": 1, "email": 1},
+        )
+        if doc is None:
+            return response(False, "Student not found"), 404
+        invalidate_filters_meta(college_oid)
         return jsonify({
             "success": True,
-            "message": f"Student {student.name} ({student.email}) deleted.",
-            "student_id": str(student.id)
+            "message": f"Student {doc.get('name')} ({doc.get('email')}) deleted.",
+            "student_id": str(doc["_id"])
         }), 200
     except Exception as e:
         return response(False, f"Error deleting student: {str(e)}"), 500
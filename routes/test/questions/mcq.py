@@ -1,28 +1,40 @@
 # routes/mcq.py
 
-from flask import Blueprint, request
+import json
+import re
+from flask import Blueprint, request, current_app
 from math import ceil
 from mongoengine.errors import ValidationError, DoesNotExist
 
-from utils.response import response
+from utils.response import response, json_stream_response
+from utils.pagination import encode_cursor, decode_cursor, after_cursor
 # reuse token_required from your other routes (adjust import path if needed)
 from routes.test.tests import token_required
 
-from models.questions.mcq import MCQ, MCQConfig
+from models.questions.mcq import MCQ, MCQ_META_CACHE_KEY, get_mcq_config
+from utils.cache import get_redis, cache_get, cache_set
 
 mcq_bp = Blueprint("mcq", __name__, url_prefix="/test/questions/mcqs")
+
+ALLOWED_SORT_FIELDS = {"marks", "difficulty_level", "time_limit", "title", "id"}
+
+# fields read by mcq_minimal_to_json; list_mcqs projects to these
+MINIMAL_FIELDS = (
+    "title", "question_text", "difficulty_level", "topic", "subtopic", "tags",
+    "marks", "time_limit", "is_multiple", "options", "correct_options",
+)
+
+
 def mcq_minimal_to_json(mcq: MCQ) -> dict:
     """
     Minimal representation used by list endpoints.
     Includes options in requested format.
     """
-    options_json = []
-    for o in mcq.options:
-        options_json.append({
-            "id": o.option_id,
-            "text": o.value,
-            "is_correct": o.option_id in mcq.correct_options
-        })
+    correct = frozenset(mcq.correct_options or ())
+    options_json = [
+        {"id": o.option_id, "text": o.value, "is_correct": o.option_id in correct}
+        for o in mcq.options
+    ]
 
     return {
         "id": str(mcq.id),
@@ -39,6 +51,56 @@ def mcq_minimal_to_json(mcq: MCQ) -> dict:
     }
 
 
+MCQ_META_TTL_SECONDS = 300
+
+
+def get_mcq_meta() -> dict:
+    """
+    topics/subtopics/tags/difficulty_levels for list_mcqs, cached in Redis
+    (MCQ_META_CACHE_KEY, 5 min; MCQ.save drops it). On a miss the MCQConfig is
+    read from the database; the per-process cache only serves setups without Redis.
+    """
+    cached = cache_get(MCQ_META_CACHE_KEY)
+    if cached:
+        return json.loads(cached)
+
+    # try to use MCQConfig document if available for canonical lists. When the result goes
+    # to Redis, read it fresh: another worker's saves only bust their own in-process copy,
+    # and a stale one written back here would hide new topics/tags for the full Redis TTL
+    config = get_mcq_config(fresh=get_redis() is not None)
+    if config:
+        topics = config.topics or []
+        subtopics = config.subtopics or []
+        tags_list = config.tags or []
+        difficulty_levels = config.difficulty_levels or []
+    else:
+        # fallback: all four distinct sets from one aggregation over the MCQ collection
+        # (was four distinct() commands, each a full scan capped at a 16MB reply);
+        # allowDiskUse lets the $group stages spill on large collections
+        facets = next(MCQ._get_collection().aggregate([
+            {"$project": {"topic": 1, "subtopic": 1, "tags": 1, "difficulty_level": 1}},
+            {"$facet": {
+                "topics": [{"$group": {"_id": "$topic"}}],
+                "subtopics": [{"$group": {"_id": "$subtopic"}}],
+                "tags": [{"$unwind": "$tags"}, {"$group": {"_id": "$tags"}}],
+                "difficulty_levels": [{"$group": {"_id": "$difficulty_level"}}],
+            }},
+        ], allowDiskUse=True), {})
+        topics = [r["_id"] for r in facets.get("topics", [])]
+        subtopics = [r["_id"] for r in facets.get("subtopics", [])]
+        tags_list = [r["_id"] for r in facets.get("tags", [])]
+        difficulty_levels = [r["_id"] for r in facets.get("difficulty_levels", [])]
+
+    meta = {
+        "topics": sorted([t for t in topics if t]),           # remove falsy
+        "subtopics": sorted([s for s in subtopics if s]),
+        "tags": sorted([t for t in tags_list if t]),
+        "difficulty_levels": sorted([d for d in difficulty_levels if d]),
+    }
+    cache_set(MCQ_META_CACHE_KEY, json.dumps(meta), MCQ_META_TTL_SECONDS)
+    return meta
+
+
 @mcq_bp.route("/", methods=["GET"])
 @token_required
 def list_mcqs():
@@ -51,9 +113,13 @@ def list_mcqs():
       - topic (exact match)
       - subtopic (exact match)
       - difficulty_level (exact match: Easy|Medium|Hard)
-      - search (optional text search against title/question_text)
+      - search (optional text search against title/question_text; whole words via the text index)
+      - search_mode ("prefix": titles starting with search, case-insensitive;
+        "contains": substring of title/question_text, slower, unindexed)
       - sort_by (optional field name, default: created at / id)
       - sort_dir (asc|desc, default desc)
+      - cursor (optional, meta.next_cursor of the previous page; replaces page and
+        reads the next rows through an index range instead of skipping)
 
     Response:
       {
@@ -62,10 +128,13 @@ def list_mcqs():
         data: {
           items: [... minimal mcq ...],
           meta: {
-            total: int,
             page: int,
             per_page: int,
-            total_pages: int,
+            total: int,                 # omitted when OPTIMIZE_PAGINATION_FOR_SPEED is set
+            total_pages: int,           # omitted when OPTIMIZE_PAGINATION_FOR_SPEED is set
+            total_estimate: int,        # fast mode without filters only
+            has_next: bool,
+            next_cursor: str | null,
             topics: [...],
             subtopics: [...],
             tags: [...],
@@ -104,6 +173,13 @@ def list_mcqs():
     sort_by = params.get("sort_by", None)  # e.g., "marks" or "difficulty_level"
     sort_dir = params.get("sort_dir", "desc").lower()
     sort_prefix = "-" if sort_dir == "desc" else ""
+    if not sort_by:
+        sort_by, sort_prefix, sort_dir = "id", "-", "desc"  # newest first by default
+    elif sort_by not in ALLOWED_SORT_FIELDS:
+        # ensure not allowing arbitrary injection; only allow a whitelist
+        sort_by = "id"
+
+    cursor = params.get("cursor")
 
     # build query
     query = {}
@@ -118,67 +194,74 @@ def list_mcqs():
         query["difficulty_level"] = difficulty_level
 
     try:
-        # base queryset
-        qs = MCQ.objects(**query)
+        # base queryset, loading only what mcq_minimal_to_json (and the cursor) read
+        qs = MCQ.objects(**query).only(*MINIMAL_FIELDS)
 
-        # basic search (title or question_text) - case-insensitive contains
         if search:
-            # MongoEngine Q for OR
-            from mongoengine.queryset.visitor import Q as MQ
-            qs = qs.filter(MQ(title__icontains=search) | MQ(question_text__icontains=search))
-
-        total = qs.count()
-
-        # sorting: default by id (descending)
-        if sort_by:
-            # ensure not allowing arbitrary injection; only allow a whitelist
-            allowed_sort_fields = {"marks", "difficulty_level", "time_limit", "title", "id"}
-            if sort_by not in allowed_sort_fields:
-                sort_by = "id"
-            ordering = f"{sort_prefix}{sort_by}"
-        else:
-            ordering = "-id"  # newest first by default
+            search_mode = params.get("search_mode")
+            if search_mode in ("prefix", "contains"):
+                if search_mode == "prefix":
+                    # case-insensitive prefix: an anchored regex without the i flag on the lowercase
+                    # shadow is a bounded range on the title_lc index (/^x/i walks every title key)
+                    qs = qs.filter(__raw__={"title_lc": re.compile("^" + re.escape(search.lower()))})
+                else:
+                    # substring anywhere in title or question_text: unanchored, unindexed;
+                    # one compiled regex for both fields (icontains built a pattern per field)
+                    rx = re.compile(re.escape(search), re.IGNORECASE)
+                    qs = qs.filter(__raw__={"$or": [{"title": rx}, {"question_text": rx}]})
+            else:
+                # default: $text on the (title, question_text) text index; matches whole (stemmed) words
+                qs = qs.search_text(search)
 
-        qs = qs.order_by(ordering)
+        # fast mode (OPTIMIZE_PAGINATION_FOR_SPEED): no count(); clients page with
+        # has_next/next_cursor and lose total/total_pages (as Eve's flag of the same name)
+        fast = current_app.config.get("OPTIMIZE_PAGINATION_FOR_SPEED")
+        total = None if fast else qs.count()
 
-        # pagination slicing (mongoengine supports skip/limit via [start:end])
-        start = (page - 1) * per_page
-        end = start + per_page
-        items = list(qs[start:end])
+        # id breaks ties so every row has a unique position for the cursor
+        if sort_by == "id":
+            qs = qs.order_by(f"{sort_prefix}id")
+        else:
+            qs = qs.order_by(f"{sort_prefix}{sort_by}", f"{sort_prefix}id")
 
-        total_pages = ceil(total / per_page) if per_page else 1
+        if cursor:
+            try:
+                last_id, sort_value = decode_cursor(cursor, sort_by, sort_dir)
+            except ValueError as e:
+                return response(False, str(e)), 400
+            qs = qs.filter(after_cursor(sort_by, sort_prefix == "-", last_id, sort_value))
+            start = 0
+        else:
+            # page= kept for existing clients (mongoengine supports skip/limit via [start:end])
+            start = (page - 1) * per_page
 
-        items_json = [mcq_minimal_to_json(m) for m in items]
+        # one extra row tells whether there is a next page
+        items = list(qs[start:start + per_page + 1])
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        next_cursor = encode_cursor(items[-1], sort_by, sort_dir) if has_next else None
 
-        # meta: try to use MCQConfig document if available for canonical lists
-        config = MCQConfig.objects.first()
-        if config:
-            topics = config.topics or []
-            subtopics = config.subtopics or []
-            tags_list = config.tags or []
-            difficulty_levels = config.difficulty_levels or []
-        else:
-            # fallback: aggregate from MCQ collection
-            # NOTE: these queries are simple and may be slow on large collections;
-            # consider maintaining MCQConfig or indexes for production.
-            topics = MCQ.objects.distinct("topic") or []
-            subtopics = MCQ.objects.distinct("subtopic") or []
-            tags_list = MCQ.objects.distinct("tags") or []
-            difficulty_levels = MCQ.objects.distinct("difficulty_level") or []
-
-        meta = {
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": total_pages,
-            "topics": sorted([t for t in topics if t]) ,           # remove falsy
-            "subtopics": sorted([s for s in subtopics if s]),
-            "tags": sorted([t for t in tags_list if t]),
-            "difficulty_levels": sorted([d for d in difficulty_levels if d]),
-        }
+        meta = {"page": page, "per_page": per_page}
+        if not fast:
+            meta["total"] = total
+            meta["total_pages"] = ceil(total / per_page) if per_page else 1
+        elif not query and not search:
+            # unfiltered: the collection metadata count costs nothing
+            meta["total_estimate"] = MCQ._get_collection().estimated_document_count()
+        meta.update({
+            "has_next": has_next,
+            "next_cursor": next_cursor,
+            **get_mcq_meta(),
+        })
 
-        data = {"items": items_json, "meta": meta}
-        return response(True, "MCQs fetched", data), 200
+        # convert before the 200 goes out so a bad row fails here (500), not mid-body;
+        # only the encoding is streamed
+        items_json = [mcq_minimal_to_json(m) for m in items]
+        return json_stream_response({
+            "success": True,
+            "message": "MCQs fetched",
+            "data": {"items": items_json, "meta": meta},
+        }, "data.items"), 200
 
     except ValidationError as e:
         return response(False, f"Invalid query: {str(e)}"), 400
@@ -1,17 +1,20 @@
 # routes/test.py
 
+import logging
 from flask import Blueprint, request
 from mongoengine.errors import ValidationError, NotUniqueError
 from datetime import datetime
 
 from utils.response import response
-from utils.jwt import verify_access_token
+from utils.jwt import verify_access_token, BEARER_PREFIX, BEARER_PREFIX_LEN
+from utils.mongo import no_deref
 from models.test.test import Test
 from math import ceil
 from mongoengine import Q
 from datetime import datetime
 
 test_bp = Blueprint("section", __name__, url_prefix="/tests")
+logger = logging.getLogger(__name__)
 
 # add these imports near top of your routes file
 from models.test.section import Section
@@ -26,10 +29,10 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_header = request.headers.get("Authorization", None)
-        if not auth_header or not auth_header.startswith("Bearer "):
+        if not auth_header or not auth_header.startswith(BEARER_PREFIX):
             return response(False, "Authorization header missing or malformed"), 401
 
-        token = auth_header.split(" ", 1)[1].strip()
+        token = auth_header[BEARER_PREFIX_LEN:].strip()
         try:
             payload = verify_access_token(token)
         except ValueError as e:
@@ -56,10 +59,12 @@ def add_section_to_test(test_id):
     description = data.get("description", "")
     instructions = data.get("instructions", "")  # new
 
-    # ensure test exists
+    # ensure test exists (id only: the section ref is appended server-side below)
     try:
-        test = Test.objects.get(id=test_id)
-    except (DoesNotExist, ValidationError):
+        exists = Test.objects(id=test_id).only("id").first()
+    except ValidationError:
+        exists = None
+    if exists is None:
         return response(False, "Test not found"), 404
 
     # create section
@@ -74,14 +79,15 @@ def add_section_to_test(test_id):
     except (ValidationError, ValueError) as e:
         return response(False, f"Error creating section: {str(e)}"), 400
 
-    # attach reference to appropriate list on Test
-    if time_restricted:
-        test.sections_time_restricted = (test.sections_time_restricted or []) + [section]
-    else:
-        test.sections_open = (test.sections_open or []) + [section]
-
+    # attach reference to appropriate list on Test: $push of the one id,
+    # instead of reading and rewriting the whole test document
+    push_field = "push__sections_time_restricted" if time_restricted else "push__sections_open"
     try:
-        test.save()
+        attached = Test.objects(id=test_id).update_one(
+            **{push_field: section}, set__updated_at=datetime.utcnow()
+        )
+        if not attached:
+            raise DoesNotExist("Test was deleted")
     except Exception as e:
         # rollback created section if attaching fails (best-effort)
         try:
@@ -136,21 +142,20 @@ def update_section(section_id):
     # If time_restricted changed, move references in Tests
     new_time_restricted = bool(section.time_restricted)
     if old_time_restricted != new_time_restricted:
+        # one update_many for all tests: $pull from the old list + $addToSet (no duplicates) on the new
         try:
             if old_time_restricted:
                 # was in time_restricted list, move to open
-                tests_with_old = Test.objects(sections_time_restricted=section)
-                for t in tests_with_old:
-                    # remove from time_restricted
-                    t.update(pull__sections_time_restricted=section)
-                    # add to open (avoid duplicates)
-                    t.update(push__sections_open=section)
+                Test.objects(sections_time_restricted=section).update(
+                    pull__sections_time_restricted=section,
+                    add_to_set__sections_open=section,
+                )
             else:
                 # was in open list, move to time_restricted
-                tests_with_old = Test.objects(sections_open=section)
-                for t in tests_with_old:
-                    t.update(pull__sections_open=section)
-                    t.update(push__sections_time_restricted=section)
+                Test.objects(sections_open=section).update(
+                    pull__sections_open=section,
+                    add_to_set__sections_time_restricted=section,
+                )
         except Exception as e:
             # log and return partial success (section updated but moving refs failed)
             return response(False, f"Section updated but failed to move references: {str(e)}"), 500
@@ -161,28 +166,34 @@ def update_section(section_id):
 # GET /tests/<test_id>/sections
 @test_bp.route("/<test_id>/sections", methods=["GET"])
 @token_required
+@no_deref(Test)  # only section ids are read from the test; sections are fetched below
 def get_sections_by_test(test_id):
     """
     Return sections attached to a test, separated into time_restricted and open lists.
     Response data: { "sections_time_restricted": [...], "sections_open": [...] }
     """
     try:
-        test = Test.objects.get(id=test_id)
-    except (DoesNotExist, ValidationError):
+        test = Test.objects(id=test_id).only("sections_time_restricted", "sections_open").first()
+    except ValidationError:
+        test = None
+    if test is None:
         return response(False, "Test not found"), 404
 
     # gather ids from test (may be empty)
     time_ids = [s.id for s in (test.sections_time_restricted or [])]
     open_ids = [s.id for s in (test.sections_open or [])]
 
-    # fetch Section documents in two queries
-    sections_time = list(Section.objects(id__in=time_ids)) if time_ids else []
-    sections_open = list(Section.objects(id__in=open_ids)) if open_ids else []
+    # fetch both lists' sections in one query, as raw dicts without their questions arrays
+    all_ids = time_ids + open_ids
+    secs = {
+        d["_id"]: Section.son_to_json(d)
+        for d in Section.objects(id__in=all_ids).exclude("questions").as_pymongo()
+    } if all_ids else {}
 
-    # convert to json
+    # in the order the test lists them
     data = {
-        "sections_time_restricted": [s.to_json() for s in sections_time],
-        "sections_open": [s.to_json() for s in sections_open],
+        "sections_time_restricted": [secs[i] for i in time_ids if i in secs],
+        "sections_open": [secs[i] for i in open_ids if i in secs],
     }
     return response(True, "Sections fetched", data), 200
 
@@ -194,7 +205,9 @@ from models.test.section import Section, SectionQuestion  # Section & embedded w
 # Source MCQ: the 'questions' folder model (question bank)
 from models.questions.mcq import MCQ as SourceMCQ
 # Target MCQ: the test-specific MCQ model where duplicates should be stored
-from models.test.questions.mcq import MCQ as TestMCQ, Option as TestOption
+from models.test.questions.mcq import MCQ as TestMCQ
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
 
 # POST /sections/<section_id>/select-mcqs
 @test_bp.route("/sections/<section_id>/select-mcqs", methods=["POST"])
@@ -211,90 +224,78 @@ def select_mcqs_for_section(section_id):
     if not isinstance(question_ids, list) or not question_ids:
         return response(False, "Provide a non-empty list 'question_ids'"), 400
 
-    # load section
-    try:
-        section = Section.objects.get(id=section_id)
-    except (DoesNotExist, ValidationError):
+    # existence check only: the questions are appended server-side below
+    section = Section.objects(id=section_id).only("id").first() if ObjectId.is_valid(section_id) else None
+    if section is None:
         return response(False, "Section not found"), 404
 
     created = []
     failed = []
 
-    # loop over provided source question ids
+    # every source MCQ in one query (ids that are not ObjectIds cannot match)
+    valid_ids = {q for q in question_ids if isinstance(q, str) and ObjectId.is_valid(q)}
+    srcs = {
+        str(m.id): m
+        for m in SourceMCQ.objects(id__in=list(valid_ids)).only(
+            "title", "question_text", "options", "correct_options", "is_multiple", "marks",
+            "negative_marks", "difficulty_level", "explanation", "tags", "time_limit",
+            "topic", "subtopic",
+        )
+    } if valid_ids else {}
+
+    # Prepare created_by metadata (use token payload if available)
+    creator = {
+        "id": getattr(request, "token_payload", {}).get("user_id", "system"),
+        "name": getattr(request, "token_payload", {}).get("name", "System"),
+    }
+
+    # duplicates as raw documents, copied from the (already validated) source MCQs;
+    # they are inserted together below
+    pending = []  # (src_id, document)
     for src_id in question_ids:
-        print(src_id)
-        new_mcq = None
-        try:
-            # fetch source MCQ from question bank
-            src = SourceMCQ.objects.get(id=src_id)
-        except (DoesNotExist, ValidationError):
-            print('got ehre')
+        src = srcs.get(src_id)
+        if src is None:
+            logger.debug("select_mcqs: source MCQ %s not found", src_id)
             failed.append({"source_id": src_id, "error": "Source MCQ not found"})
             continue
 
-        try:
-            # Build list of Embedded Option objects for target TestMCQ
-            target_options = []
-            for o in getattr(src, "options", []) or []:
-                opt = TestOption(
-                    option_id=getattr(o, "option_id", None) or None,
-                    value=getattr(o, "value", "")
-                )
-                target_options.append(opt)
-
-            # Prepare created_by metadata (use token payload if available)
-            creator = {
-                "id": getattr(request, "token_payload", {}).get("user_id", "system"),
-                "name": getattr(request, "token_payload", {}).get("name", "System"),
-            }
-
-            # Create duplicate TestMCQ
-            new_mcq = TestMCQ(
-                title=getattr(src, "title", "") or "Untitled",
-                question_text=getattr(src, "question_text", "") or "",
-                options=target_options,
-                correct_options=list(getattr(src, "correct_options", []) or []),
-                is_multiple=bool(getattr(src, "is_multiple", False)),
-                marks=getattr(src, "marks", 0) or 0,
-                negative_marks=getattr(src, "negative_marks", 0) or 0,
-                difficulty_level=getattr(src, "difficulty_level", None),
-                explanation=getattr(src, "explanation", None),
-                tags=list(getattr(src, "tags", []) or []),
-                time_limit=getattr(src, "time_limit", None),
-                topic=getattr(src, "topic", None),
-                subtopic=getattr(src, "subtopic", None),
-                created_by=creator
-            )
-
-            new_mcq.save()
+        doc = src.to_mongo().to_dict()
+        # new id assigned here so the section refs are known up front
+        doc["_id"] = ObjectId()
+        doc["created_by"] = creator
+        doc.setdefault("title", "Untitled")
+        pending.append((src_id, doc))
 
-            # create SectionQuestion embedded doc and append
-            sq = SectionQuestion(
-                question_type="mcq",
-                mcq_ref=new_mcq,    # <-- USE mcq_ref now
-                coding_ref=None,
-                rearrange_ref=None
+    # one unordered insert_many for all duplicates; per-document failures come back in writeErrors
+    insert_errors = {}
+    if pending:
+        try:
+            TestMCQ._get_collection().insert_many(
+                [doc for _, doc in pending], ordered=False
             )
-
-            section.questions = (section.questions or []) + [sq]
-            created.append({"source_id": src_id, "new_id": str(new_mcq.id)})
-
+        except BulkWriteError as e:
+            insert_errors = {err["index"]: err.get("errmsg") for err in e.details.get("writeErrors", [])}
         except Exception as e:
-            failed.append({"source_id": src_id, "error": str(e)})
-            # attempt best-effort cleanup: if new_mcq exists, delete it
-            try:
-                if new_mcq is not None and getattr(new_mcq, "id", None):
-                    new_mcq.delete()
-            except Exception:
-                pass
+            insert_errors = {i: str(e) for i in range(len(pending))}
+
+    new_sqs = []
+    for pos, (src_id, doc) in enumerate(pending):
+        if pos in insert_errors:
+            failed.append({"source_id": src_id, "error": insert_errors[pos]})
             continue
+        # create SectionQuestion embedded doc for the new MCQ
+        new_sqs.append(SectionQuestion(question_type="mcq", question_id=doc["_id"]))
+        created.append({"source_id": src_id, "new_id": str(doc["_id"])})
 
-    # Save section once after processing all
+    # append all new entries server-side ($push/$each): only the new items go over the wire,
+    # the existing questions array is neither sent back nor revalidated
     try:
-        print(section.questions)
-        section.save()
+        if new_sqs:
+            Section.objects(id=section.id).update_one(
+                push__questions=new_sqs, set__updated_at=datetime.utcnow()
+            )
     except Exception as e:
-        print(e)
+        logger.exception("select_mcqs: saving section %s failed", section_id)
         # If saving section fails, report error and (optionally) rollback created MCQs
         return response(False, f"Failed to attach questions to section: {str(e)}"), 500
 
@@ -319,36 +320,20 @@ def get_section_questions(section_id):
       ]
     }
     """
-    try:
-        section = Section.objects.get(id=section_id)
-    except (DoesNotExist, ValidationError):
+    # the section and all its referenced docs in one aggregation
+    resolved = Section.load_with_questions(section_id) if ObjectId.is_valid(section_id) else None
+    if resolved is None:
         return response(False, "Section not found"), 404
 
     results = []
 
-    for sq in section.questions or []:
+    for sq, question in resolved:
         try:
-            if sq.question_type == "mcq" and getattr(sq, "mcq_ref", None):
-                results.append({
-                    "type": "mcq",
-                    "question": sq.mcq_ref.to_json() if hasattr(sq.mcq_ref, "to_json") else None
-                })
-            elif sq.question_type == "coding" and getattr(sq, "coding_ref", None):
-                results.append({
-                    "type": "coding",
-                    "question": sq.coding_ref.to_json() if hasattr(sq.coding_ref, "to_json") else None
-                })
-            elif sq.question_type == "rearrange" and getattr(sq, "rearrange_ref", None):
-                results.append({
-                    "type": "rearrange",
-                    "question": sq.rearrange_ref.to_json() if hasattr(sq.rearrange_ref, "to_json") else None
-                })
-            else:
-                # If the declared type is present but corresponding ref is null, return null question
-                results.append({
-                    "type": sq.question_type,
-                    "question": None
-                })
+            # null question if the type is unsupported or the referenced doc is gone
+            results.append({
+                "type": sq.question_type,
+                "question": question.to_json() if question is not None else None
+            })
         except Exception as e:
             results.append({
                 "type": sq.question_type,
@@ -376,14 +361,20 @@ def update_mcq(mcq_id):
 
         from models.test.questions.mcq import Option  # ensure correct import path
         import uuid as _uuid
+        # one pass builds the options and both lookups used by the correct-option checks below
         normalized_options = []
+        option_ids_set = set()
+        map_by_val = {}
         for opt in options_in:
             # accept both {option_id, value} or {value}
-            val = (opt.get('value') if isinstance(opt, dict) else str(opt)).strip()
+            is_dict = isinstance(opt, dict)
+            val = (opt.get('value') if is_dict else str(opt)).strip()
             if not val:
                 return response(False, 'Option values cannot be empty'), 400
-            oid = (opt.get('option_id') if isinstance(opt, dict) else None) or str(_uuid.uuid4())
+            oid = (opt.get('option_id') if is_dict else None) or str(_uuid.uuid4())
             normalized_options.append(Option(option_id=oid, value=val))
+            option_ids_set.add(oid)
+            map_by_val[val] = oid
 
         # --- correct options ---
         is_multiple = bool(data.get('is_multiple', False))
@@ -392,7 +383,6 @@ def update_mcq(mcq_id):
         if not correct_ids:
             by_values = data.get('correct_option_values') or []
             if by_values:
-                map_by_val = {o.value: o.option_id for o in normalized_options}
                 correct_ids = [map_by_val[v] for v in by_values if v in map_by_val]
         if not correct_ids:
             by_indexes = data.get('correct_option_indexes') or []
@@ -403,11 +393,9 @@ def update_mcq(mcq_id):
                     except Exception:
                         pass
 
-        option_ids_set = {o.option_id for o in normalized_options}
         if not correct_ids:
             return response(False, 'Select at least one correct option'), 400
         if not all(cid in option_ids_set for cid in correct_ids):
-            print('yes')
             return response(False, 'correct_options contain unknown IDs'), 400
         if not is_multiple and len(correct_ids) > 1:
             return response(False, 'Multiple correct not allowed when is_multiple is false'), 400
@@ -435,7 +423,7 @@ def update_mcq(mcq_id):
     except ValidationError as ve:
         return response(False, f'Validation error: {ve}'), 400
     except Exception as e:
-        print(e)
+        logger.exception("update_mcq %s failed", mcq_id)
         return response(False, f'Error: {str(e)}'), 500
 
 @test_bp.route('/mcq/<string:mcq_id>', methods=['GET'])
@@ -450,5 +438,5 @@ def get_mcq(mcq_id):
     except ValidationError:
         return response(False, 'Invalid MCQ ID'), 400
     except Exception as e:
-        print(e)
+        logger.exception("get_mcq %s failed", mcq_id)
         return response(False, f'Error: {str(e)}'), 500
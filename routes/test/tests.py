@@ -1,17 +1,110 @@
 # routes/test.py
 
+import hashlib
+import logging
+import re
+import threading
+import time
 from flask import Blueprint, request
 from mongoengine.errors import ValidationError, NotUniqueError
-from datetime import datetime
-
-from utils.response import response
-from utils.jwt import verify_access_token
-from models.test.test import Test
+from datetime import datetime, timezone
+
+from utils.response import response, json_stream_response
+from utils.jwt import verify_access_token, BEARER_PREFIX, BEARER_PREFIX_LEN
+from utils.mongo import no_deref
+from utils.pagination import encode_cursor, decode_cursor, after_cursor
+from utils.cache import cache_get, cache_set, cache_incr
+from models.test.test import Test, MINIMAL_FIELDS
 from math import ceil
-from mongoengine import Q
-from datetime import datetime
+from pymongo import ReadPreference
+from pymongo.errors import ExecutionTimeout
 
 test_bp = Blueprint("test", __name__, url_prefix="/tests")
+logger = logging.getLogger(__name__)
+
+try:
+    # C parser; also takes the "Z" suffix that datetime.fromisoformat rejects before 3.11
+    from ciso8601 import parse_datetime as _parse_iso8601
+except ImportError:
+    _parse_iso8601 = datetime.fromisoformat
+
+
+def _parse_datetime(value):
+    """ISO 8601 string -> naive UTC datetime (what utcnow() filters and stored tests use)."""
+    dt = _parse_iso8601(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+# time-window filters for the list endpoints as raw queries on the stored field names,
+# so each request skips mongoengine's per-call field lookup / query transform
+_START = Test._fields["start_datetime"].db_field
+_END = Test._fields["end_datetime"].db_field
+
+
+def _past_qs(now):
+    return Test.objects(__raw__={_END: {"$lt": now}})
+
+
+def _ongoing_qs(now):
+    return Test.objects(__raw__={_START: {"$lte": now}, _END: {"$gte": now}})
+
+
+def _upcoming_qs(now):
+    return Test.objects(__raw__={_START: {"$gt": now}})
+
+
+# skip() walks every skipped entry; past this offset list calls are logged so clients move to ?after=
+DEEP_SKIP_WARN = 1000
+
+
+# fixed one-minute window of 401s per client address (request.remote_addr; the forwarded
+# client only when PROXY_FIX_X_FOR opts into trusting the proxy); past the limit the client
+# gets 429 before its token is even decoded (scanners replaying junk bearer tokens).
+# Failures are counted in Redis so all workers share one window (per process without Redis);
+# the check before decoding only reads this process's dict of blocked addresses, so a
+# request with a good token costs no Redis round trip.
+AUTH_FAILURE_LIMIT = 50
+AUTH_FAILURE_WINDOW_SECONDS = 60
+_AUTH_FAILURES_LOCAL_MAX = 10000
+_auth_failures = {}  # addr -> (window_expires_at, count); only used without Redis
+_auth_blocked = {}  # addr -> (blocked_until, count)
+_auth_failures_lock = threading.Lock()
+
+
+def _bounded_put(d, key, value, now):
+    """d[key] = value for (expires_at, ...) values, first dropping expired entries once d is full."""
+    if key not in d and len(d) >= _AUTH_FAILURES_LOCAL_MAX:
+        for k in [k for k, v in d.items() if v[0] <= now]:
+            del d[k]
+        if len(d) >= _AUTH_FAILURES_LOCAL_MAX:
+            d.clear()
+    d[key] = value
+
+
+def _auth_blocked_now(addr):
+    """True while addr is over the limit for its current window (in-process check only)."""
+    hit = _auth_blocked.get(addr)
+    return hit is not None and hit[0] > time.monotonic()
+
+
+def _record_auth_failure(addr):
+    """Count one 401 for addr; past the limit, block it here until the window ends."""
+    n = cache_incr(f"tests:authfail:{addr}", AUTH_FAILURE_WINDOW_SECONDS)
+    now = time.monotonic()
+    with _auth_failures_lock:
+        if n is None:
+            # no Redis (or unreachable): count in this process
+            hit = _auth_failures.get(addr)
+            if hit is None or hit[0] <= now:
+                hit = (now + AUTH_FAILURE_WINDOW_SECONDS, 0)
+            hit = (hit[0], hit[1] + 1)
+            _bounded_put(_auth_failures, addr, hit, now)
+            n = hit[1]
+        if n >= AUTH_FAILURE_LIMIT:
+            # the Redis window's exact end isn't known here; a full window is the upper bound
+            _bounded_put(_auth_blocked, addr, (now + AUTH_FAILURE_WINDOW_SECONDS, n), now)
 
 
 def token_required(f):
@@ -20,20 +113,28 @@ def token_required(f):
 
     @wraps(f)
     def decorated(*args, **kwargs):
+        addr = request.remote_addr
+        if _auth_blocked_now(addr):
+            return response(False, "Too many failed authentication attempts, try again later"), 429
+
         auth_header = request.headers.get("Authorization", None)
-        if not auth_header or not auth_header.startswith("Bearer "):
+        if not auth_header or not auth_header.startswith(BEARER_PREFIX):
+            _record_auth_failure(addr)
             return response(False, "Authorization header missing or malformed"), 401
 
-        token = auth_header.split(" ", 1)[1].strip()
+        token = auth_header[BEARER_PREFIX_LEN:].strip()
         try:
             payload = verify_access_token(token)
         except ValueError as e:
+            _record_auth_failure(addr)
             return response(False, str(e)), 401
 
         request.token_payload = payload
         return f(*args, **kwargs)
 
     return decorated
+
+
 def _parse_pagination_args():
     """Helper to parse page/per_page query params. Returns (page, per_page, error_message)"""
     try:
@@ -46,31 +147,164 @@ def _parse_pagination_args():
     return page, per_page, None
 
 
+def _search_term():
+    return (request.args.get("q") or "").strip()
+
+
 def _apply_search(qs):
     """Apply search query 'q' filtering across test_name, description, instructions."""
-    q = (request.args.get("q") or "").strip()
+    q = _search_term()
     if not q:
         return qs
-    # Case-insensitive partial match on name/description/instructions
-    search_filter = Q(test_name__icontains=q) | Q(description__icontains=q) | Q(instructions__icontains=q)
-    return qs.filter(search_filter)
+    if q.startswith("^") and len(q) > 1:
+        # explicit prefix search, case-insensitive: an anchored regex without the i flag on the
+        # lowercase shadow is a bounded range on the test_name_lc index (/^abc/i scans every key)
+        return qs.filter(__raw__={"test_name_lc": re.compile("^" + re.escape(q[1:].lower()))})
+    # $text on the weighted (test_name, instructions, description) text index; whole (stemmed) words
+    return qs.search_text(q)
+
+
+COUNT_CACHE_TTL_SECONDS = 10
 
 
-def _paginate_and_respond(qs, page, per_page, sort=None):
-    """Apply sorting, pagination and return the response dict."""
-    total = qs.count()
-    if sort:
-        qs = qs.order_by(sort)
+def _count_cache_key():
+    # per endpoint + search term: the time filters use `now`, so the raw query differs on
+    # every call while the count barely moves
+    digest = hashlib.blake2b(f"{request.path}|{_search_term()}".encode(), digest_size=16).hexdigest()
+    return f"tests:count:{digest}"
+
+
+# list pages tolerate a little replication lag: read them from a secondary when there is one
+# (writes and GET /tests/<id> stay on the primary), and cap each list query's server time
+LIST_READ_PREFERENCE = ReadPreference.SECONDARY_PREFERRED
+LIST_MAX_TIME_MS = 2000
+
+
+def _list_collection():
+    return Test._get_collection().with_options(read_preference=LIST_READ_PREFERENCE)
+
+
+def _known_stamp(qs):
+    """
+    (total, newest updated_at) of the listed set when it costs no count: the collection's
+    metadata count + the updated_at index if unfiltered, else a stamp cached in the last
+    few seconds. None if it must be counted.
+    """
+    if not qs._query:
+        coll = _list_collection()
+        newest = next(coll.find({}, {"updated_at": 1}, sort=[("updated_at", -1)], limit=1,
+                                max_time_ms=LIST_MAX_TIME_MS), {})
+        return coll.estimated_document_count(maxTimeMS=LIST_MAX_TIME_MS), newest.get("updated_at")
+    cached = cache_get(_count_cache_key())
+    if cached is None:
+        return None
+    total, _, updated_ms = cached.decode().partition("|")
+    return int(total), datetime.utcfromtimestamp(int(updated_ms) / 1000) if updated_ms else None
+
+
+def _store_stamp(total, updated):
+    updated_ms = str(int(updated.replace(tzinfo=timezone.utc).timestamp() * 1000)) if updated else ""
+    cache_set(_count_cache_key(), f"{total}|{updated_ms}", COUNT_CACHE_TTL_SECONDS)
+
+
+def _list_etag(stamp):
+    """Weak ETag of a list page: the exact URL plus the listed set's (total, newest updated_at)."""
+    total, updated = stamp
+    key = f"{request.full_path}|{total}|{updated.isoformat() if updated else ''}"
+    return hashlib.blake2s(key.encode(), digest_size=16).hexdigest()
+
+
+def _paginate_and_respond(qs, page, per_page, sort=None, conditional=True):
+    """
+    Apply sorting, pagination and return the response dict.
+    With ?after=<meta.next_cursor> the page is read through a (sort field, _id) range
+    instead of skipping (page is then ignored), and no count is run: meta.has_next
+    replaces total/total_pages. When the total has to be counted it comes from one
+    $group aggregation (with the newest updated_at); the page is always a find, so its
+    sort walks the (field, id) indexes. Pages carry a weak ETag (and Last-Modified) from
+    the listed set's total and newest updated_at; a matching If-None-Match gets a 304.
+    conditional=False leaves them off: for the past/ongoing/upcoming windows the set also
+    changes as `now` moves, which (total, updated_at) cannot see.
+    """
+    if not sort and _search_term() and not _search_term().startswith("^"):
+        # text search without an explicit sort: best matches first (no cursor for relevance order)
+        qs = qs.order_by("$text_score")
+        sort_by = None
+    else:
+        sort = sort or "start_datetime"
+        sort_dir = "desc" if sort.startswith("-") else "asc"
+        sort_by = sort.lstrip("-+")
+        if sort_by != "id" and sort_by not in Test._fields:
+            return response(False, f"Cannot sort by '{sort_by}'"), 400
+        # id breaks ties so every row has a unique position for the cursor
+        prefix = "-" if sort_dir == "desc" else ""
+        qs = qs.order_by(f"{prefix}{sort_by}", f"{prefix}id")
+
+    after = request.args.get("after")
+    if after and sort_by:
+        try:
+            last_id, sort_value = decode_cursor(after, sort_by, sort_dir)
+        except ValueError as e:
+            return response(False, str(e)), 400
+        qs = qs.filter(after_cursor(sort_by, sort_dir == "desc", last_id, sort_value))
+        skip = 0
     else:
-        qs = qs.order_by("start_datetime")
+        skip = (page - 1) * per_page
+        if skip > DEEP_SKIP_WARN:
+            logger.warning("tests list: skip=%d; clients should page with ?after=<next_cursor>", skip)
 
-    total_pages = ceil(total / per_page) if per_page else 1
-    skip = (page - 1) * per_page
-    qs = qs.skip(skip).limit(per_page)
+    # load only what to_minimal_json (and the cursor's sort field) reads
+    fields = MINIMAL_FIELDS + ((sort_by,) if sort_by and sort_by not in MINIMAL_FIELDS else ())
 
-    tests = [t.to_minimal_json() for t in qs]
-    meta = {"total": total, "page": page, "per_page": per_page, "total_pages": total_pages}
-    return response(True, "OK", data={"tests": tests, "meta": meta}), 200
+    try:
+        stamp = _known_stamp(qs)
+        if stamp is None and not (after and sort_by):
+            # count + newest updated_at in one aggregation; the page itself stays a find below
+            # (a $sort inside $facet can never use the (field, id) indexes)
+            group = next(_list_collection().aggregate([
+                {"$match": qs._query},
+                {"$group": {"_id": None, "n": {"$sum": 1}, "updated": {"$max": "$updated_at"}}},
+            ], maxTimeMS=LIST_MAX_TIME_MS), {})
+            stamp = (group.get("n", 0), group.get("updated"))
+            _store_stamp(*stamp)
+
+        # conditional GET: an unchanged listing costs the (usually cached) stamp only.
+        # A cursor page without a cached stamp gets no ETag rather than a count.
+        etag = _list_etag(stamp) if stamp and conditional else None
+        if etag and request.if_none_match.contains_weak(etag):
+            return "", 304, {"ETag": f'W/"{etag}"'}
+
+        # raw dicts (as_pymongo): no Test instances are built for a list page;
+        # one extra row tells whether there is a next page
+        rows = list(
+            qs.read_preference(LIST_READ_PREFERENCE).max_time_ms(LIST_MAX_TIME_MS)
+            .only(*fields).skip(skip).limit(per_page + 1).as_pymongo()
+        )
+    except ExecutionTimeout:
+        logger.warning("tests list query exceeded %d ms (%s)", LIST_MAX_TIME_MS, request.full_path)
+        return response(False, "Listing took too long, narrow the search or page with ?after="), 503
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1], sort_by, sort_dir) if has_next and sort_by else None
+
+    meta = {"page": page, "per_page": per_page, "has_next": has_next, "next_cursor": next_cursor}
+    if stamp and not (after and sort_by):
+        total = stamp[0]
+        meta["total"] = total
+        meta["total_pages"] = ceil(total / per_page) if per_page else 1
+    # converted before the 200 goes out so a bad row fails the request, not the body mid-stream;
+    # encoding is still one test at a time
+    tests = [Test.son_to_minimal_json(d) for d in rows]
+    resp = json_stream_response({
+        "success": True,
+        "message": "OK",
+        "data": {"tests": tests, "meta": meta},
+    }, "data.tests")
+    if etag:
+        resp.set_etag(etag, weak=True)
+        if stamp[1]:
+            resp.last_modified = stamp[1]
+    return resp, 200
 
 
 @test_bp.route("/add", methods=["POST"])
@@ -88,8 +322,7 @@ def add_test():
         "tags": ["python", "arrays"]
     }
     """
-    data = request.get_json() or {}
-    print(data)
+    data = request.get_json(silent=True) or {}
 
     # Accept either naming style (frontend sometimes uses camelCase)
     test_name = data.get("test_name") or data.get("name")
@@ -100,8 +333,8 @@ def add_test():
         return response(False, "test_name, start_datetime and end_datetime are required"), 400
 
     try:
-        start = datetime.fromisoformat(start_datetime)
-        end = datetime.fromisoformat(end_datetime)
+        start = _parse_datetime(start_datetime)
+        end = _parse_datetime(end_datetime)
     except Exception:
         return response(False, "Invalid datetime format, use ISO 8601"), 400
 
@@ -125,18 +358,12 @@ def add_test():
         created_by=created_by,
     )
 
-    # Call clean explicitly to surface validation errors early (clean also runs inside save)
-    try:
-        test.clean()
-    except ValueError as e:
-        return response(False, f"Validation error: {str(e)}"), 400
-    except ValidationError as e:
-        return response(False, f"Validation error: {str(e)}"), 400
-
+    # save() runs clean(); its ValueError / ValidationError come back as a 400
     try:
         test.save()
-    except (ValidationError, NotUniqueError, ValueError) as e:
-        # ValueError can still be raised from clean() inside save or other places
+    except (ValidationError, ValueError) as e:
+        return response(False, f"Validation error: {str(e)}"), 400
+    except NotUniqueError as e:
         return response(False, f"Error saving test: {str(e)}"), 400
     except Exception as e:
         # catch-all so we don't leak a 500 without helpful message
@@ -152,7 +379,8 @@ def get_all_tests():
     """
     GET /tests
     Query params:
-      - q: optional search string (matches name/description/notes)
+      - q: optional search string (words in name/description/instructions;
+        "^abc" for names starting with "abc")
       - page: page number (1-based)
       - per_page: items per page
       - sort: optional mongoengine order_by string (e.g. "-start_datetime")
@@ -181,12 +409,12 @@ def get_past_tests():
         return response(False, err), 400
 
     now = datetime.utcnow()
-    qs = Test.objects(end_datetime__lt=now)
+    qs = _past_qs(now)
     qs = _apply_search(qs)
 
     # default sort: newest finished first
     sort = request.args.get("sort") or "-end_datetime"
-    return _paginate_and_respond(qs, page, per_page, sort)
+    return _paginate_and_respond(qs, page, per_page, sort, conditional=False)
 
 
 @test_bp.route("/ongoing", methods=["GET"])
@@ -201,12 +429,12 @@ def get_ongoing_tests():
         return response(False, err), 400
 
     now = datetime.utcnow()
-    qs = Test.objects(start_datetime__lte=now, end_datetime__gte=now)
+    qs = _ongoing_qs(now)
     qs = _apply_search(qs)
 
     # default sort: soonest starting first
     sort = request.args.get("sort") or "start_datetime"
-    return _paginate_and_respond(qs, page, per_page, sort)
+    return _paginate_and_respond(qs, page, per_page, sort, conditional=False)
 
 
 @test_bp.route("/upcoming", methods=["GET"])
@@ -221,17 +449,18 @@ def get_upcoming_tests():
         return response(False, err), 400
 
     now = datetime.utcnow()
-    qs = Test.objects(start_datetime__gt=now)
+    qs = _upcoming_qs(now)
     qs = _apply_search(qs)
 
     # default sort: earliest upcoming first
     sort = request.args.get("sort") or "start_datetime"
-    return _paginate_and_respond(qs, page, per_page, sort)
+    return _paginate_and_respond(qs, page, per_page, sort, conditional=False)
 
 
 # GET /tests/<id>
 @test_bp.route("/<test_id>", methods=["GET"])
 @token_required
+@no_deref(Test)  # to_json only needs section ids
 def get_test(test_id):
     """
     GET /tests/<test_id>
@@ -253,7 +482,7 @@ def update_test(test_id):
       "test_name", "description", "start_datetime", "end_datetime",
       "instructions", "tags"
     """
-    data = request.get_json() or {}
+    data = request.get_json(silent=True) or {}
     try:
         test = Test.objects.get(id=test_id)
     except (DoesNotExist, ValidationError):
@@ -266,14 +495,14 @@ def update_test(test_id):
     # handle datetimes if provided
     if "start_datetime" in data and data["start_datetime"] is not None:
         try:
-            test.start_datetime = datetime.fromisoformat(data["start_datetime"])
+            test.start_datetime = _parse_datetime(data["start_datetime"])
             updated = True
         except Exception:
             return response(False, "Invalid start_datetime format, use ISO 8601"), 400
 
     if "end_datetime" in data and data["end_datetime"] is not None:
         try:
-            test.end_datetime = datetime.fromisoformat(data["end_datetime"])
+            test.end_datetime = _parse_datetime(data["end_datetime"])
             updated = True
         except Exception:
             return response(False, "Invalid end_datetime format, use ISO 8601"), 400
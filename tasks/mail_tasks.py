@@ -1,9 +1,11 @@
 # tasks/mail_tasks.py
 import os
+import atexit
 import logging
 import smtplib
+import threading
 from email.message import EmailMessage
-from celery_app import celery
+from celery_app import celery, EAGER
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +16,9 @@ SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 DEFAULT_FROM = SMTP_USER or f"no-reply@{os.getenv('APP_DOMAIN','deloai.com')}"
 APP_URL = os.getenv("APP_URL", "https://deloai.com")
 
-# Accept flexible kwargs so callers with different names work
-@celery.task(name="send_mail", bind=True, max_retries=3, default_retry_delay=10)
-def send_mail(self, *args, **kwargs):
+def _build_message(*args, **kwargs):
     """
-    Flexible email sending task.
+    Normalize the flexible send_mail arguments into (EmailMessage, recipients).
 
     Accepts:
       - to or to_email : str or List[str]
@@ -26,75 +26,216 @@ def send_mail(self, *args, **kwargs):
       - html or html_body
       - text or plain_body or plain
     """
+    # Normalize recipients
+    to = kwargs.get("to") or kwargs.get("to_email") or kwargs.get("recipients") or kwargs.get("recipient")
+    if not to:
+        # sometimes people pass first positional arg as to
+        if len(args) >= 1:
+            to = args[0]
+    if not to:
+        raise ValueError("Recipient(s) missing (to / to_email).")
+
+    if isinstance(to, str):
+        recipients = [t.strip() for t in to.split(",") if t.strip()]
+    elif isinstance(to, (list, tuple, set)):
+        recipients = [str(t).strip() for t in to]
+    else:
+        raise ValueError("Invalid recipient type. Must be str or list.")
+
+    subject = kwargs.get("subject") or kwargs.get("title") or (args[1] if len(args) >= 2 else None)
+    html = kwargs.get("html") or kwargs.get("html_body") or kwargs.get("body_html") or (args[2] if len(args) >= 3 else None)
+    text = kwargs.get("text") or kwargs.get("plain_body") or kwargs.get("plain") or (args[3] if len(args) >= 4 else None)
+
+    if not subject:
+        subject = "(No subject)"
+
+    if text is None:
+        text = "Please view this email in an HTML-capable client."
+
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = DEFAULT_FROM
+    msg["To"] = ", ".join(recipients)
+    msg.set_content(str(text))
+
+    if html:
+        msg.add_alternative(str(html), subtype="html")
+
+    return msg, recipients
+
+
+def _smtp_connect():
+    """Open an authenticated SMTP session (EHLO, STARTTLS, EHLO, LOGIN)."""
+    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
     try:
-        # Normalize recipients
-        to = kwargs.get("to") or kwargs.get("to_email") or kwargs.get("recipients") or kwargs.get("recipient")
-        if not to:
-            # sometimes people pass first positional arg as to
-            if len(args) >= 1:
-                to = args[0]
-        if not to:
-            raise ValueError("Recipient(s) missing (to / to_email).")
-
-        if isinstance(to, str):
-            recipients = [t.strip() for t in to.split(",") if t.strip()]
-        elif isinstance(to, (list, tuple, set)):
-            recipients = [str(t).strip() for t in to]
-        else:
-            raise ValueError("Invalid recipient type. Must be str or list.")
-
-        subject = kwargs.get("subject") or kwargs.get("title") or (args[1] if len(args) >= 2 else None)
-        html = kwargs.get("html") or kwargs.get("html_body") or kwargs.get("body_html") or (args[2] if len(args) >= 3 else None)
-        text = kwargs.get("text") or kwargs.get("plain_body") or kwargs.get("plain") or (args[3] if len(args) >= 4 else None)
-
-        if not subject:
-            subject = "(No subject)"
-
-        if text is None:
-            text = "Please view this email in an HTML-capable client."
-
-        msg = EmailMessage()
-        msg["Subject"] = subject
-        msg["From"] = DEFAULT_FROM
-        msg["To"] = ", ".join(recipients)
-        msg.set_content(str(text))
-
-        if html:
-            msg.add_alternative(str(html), subtype="html")
-
-        # connect and send
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as s:
-            # optional EHLO for some servers
-            try:
-                s.ehlo()
-            except Exception:
-                pass
+        # optional EHLO for some servers
+        try:
+            s.ehlo()
+        except Exception:
+            pass
 
-            # If using STARTTLS
-            try:
-                s.starttls()
-                s.ehlo()
-            except Exception as e:
-                logger.debug("STARTTLS not available or failed: %s", e)
+        # If using STARTTLS
+        try:
+            s.starttls()
+            s.ehlo()
+        except Exception as e:
+            logger.debug("STARTTLS not available or failed: %s", e)
 
-            if SMTP_USER and SMTP_PASSWORD:
-                s.login(SMTP_USER, SMTP_PASSWORD)
+        if SMTP_USER and SMTP_PASSWORD:
+            s.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        _smtp_quit(s)
+        raise
+    return s
 
-            s.send_message(msg)
 
-        logger.info("Email sent to %s (subject=%s)", recipients, subject)
-        return {"status": "ok", "recipients": recipients, "subject": subject}
+def _smtp_quit(s):
+    try:
+        s.quit()
+    except Exception:
+        try:
+            s.close()
+        except Exception:
+            pass
 
-    except smtplib.SMTPAuthenticationError as ae:
-        logger.exception("SMTP auth error sending email to %s: %s", locals().get("recipients"), ae)
-        # do not retry immediately if credentials are wrong
-        raise self.retry(exc=ae, countdown=60)
 
-    except Exception as exc:
-        # log and retry a couple of times; Celery settings above control retries
-        logger.exception("Failed to send email: %s", exc)
+# one logged-in session per worker thread, reused across tasks so a burst of mails
+# pays the TCP + TLS handshake and LOGIN once instead of per message
+_smtp_local = threading.local()
+
+
+def _get_smtp():
+    """The thread's cached SMTP session, pinged with NOOP; reconnects if it went away."""
+    s = getattr(_smtp_local, "conn", None)
+    if s is not None:
         try:
-            raise self.retry(exc=exc)
-        except self.MaxRetriesExceededError:
-            logger.error("Max retries exceeded for send_mail to %s", locals().get("recipients"))
-            return {"status": "failed", "error": str(exc)}
+            if s.noop()[0] == 250:
+                return s
+        except (smtplib.SMTPException, OSError):
+            pass
+        _smtp_quit(s)
+        _smtp_local.conn = None
+    s = _smtp_connect()
+    _smtp_local.conn = s
+    return s
+
+
+def close_smtp():
+    """Close this thread's cached SMTP session (worker shutdown)."""
+    s = getattr(_smtp_local, "conn", None)
+    _smtp_local.conn = None
+    if s is not None:
+        _smtp_quit(s)
+
+
+atexit.register(close_smtp)
+if not EAGER:
+    # prefork children leave through os._exit, which skips atexit
+    from celery.signals import worker_process_shutdown
+    worker_process_shutdown.connect(lambda **_: close_smtp(), weak=False)
+
+
+def _smtp_send(msg):
+    """Send one message over the cached session; a dropped session is reopened once."""
+    try:
+        _get_smtp().send_message(msg)
+    except smtplib.SMTPServerDisconnected:
+        close_smtp()
+        _get_smtp().send_message(msg)
+
+
+# SMTPException subclasses OSError, so these are listed explicitly rather than caught as OSError:
+# refusals of one message (the session stays usable) ...
+_SMTP_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+# ... versus failures of the session itself
+_SMTP_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError,
+    ConnectionError, TimeoutError,
+)
+
+
+# Accept flexible kwargs so callers with different names work.
+# Transient SMTP / network failures are retried by Celery with exponential backoff
+# and jitter (capped at 5 min), so a mail server blip doesn't retry every task in step.
+# Permanent (5xx) rejections are returned as failed before they reach autoretry_for.
+@celery.task(
+    name="send_mail",
+    bind=True,
+    autoretry_for=(smtplib.SMTPException, OSError),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    retry_jitter=True,
+    max_retries=5,
+)
+def send_mail(self, *args, **kwargs):
+    """
+    Flexible email sending task (arguments: see _build_message).
+    """
+    msg, recipients = _build_message(*args, **kwargs)
+    subject = msg["Subject"]
+
+    try:
+        _smtp_send(msg)
+    except smtplib.SMTPAuthenticationError as ae:
+        # wrong credentials don't heal by retrying
+        logger.error("SMTP auth error sending email to %s: %s", recipients, ae)
+        return {"status": "failed", "error": str(ae)}
+    except smtplib.SMTPRecipientsRefused as rr:
+        # every recipient refused; 5xx refusals are permanent, 4xx go to autoretry
+        if all(code >= 500 for code, _ in rr.recipients.values()):
+            logger.error("Recipients refused for email to %s: %s", recipients, rr.recipients)
+            return {"status": "failed", "error": str(rr)}
+        raise
+    except smtplib.SMTPResponseException as re_:
+        # 5xx replies (sender refused, data rejected, ...) are permanent
+        if re_.smtp_code >= 500:
+            logger.error("SMTP %s sending email to %s: %s", re_.smtp_code, recipients, re_.smtp_error)
+            return {"status": "failed", "error": str(re_)}
+        raise
+
+    logger.info("Email sent to %s (subject=%s)", recipients, subject)
+    return {"status": "ok", "recipients": recipients, "subject": subject}
+
+
+@celery.task(name="send_mail_bulk")
+def send_mail_bulk(items):
+    """
+    Send many mails from one task, so a bulk request costs one broker publish
+    instead of one per recipient. `items` is a list of send_mail kwargs dicts.
+    All mails go through the one cached SMTP session (one handshake + LOGIN for
+    the batch). A mail that fails here is handed to send_mail, which owns the
+    retry policy; if the server cannot be reached at all, the rest of the batch
+    is handed over without trying each mail against it.
+    """
+    sent = 0
+    requeued = 0
+    for i, item in enumerate(items):
+        give_up = False
+        try:
+            msg, recipients = _build_message(**item)
+            _smtp_send(msg)
+            sent += 1
+            continue
+        except _SMTP_MESSAGE_ERRORS as exc:
+            # this message was refused; the session is fine for the rest of the batch
+            logger.warning("Bulk mail to %s refused, requeueing via send_mail: %s", item.get("to"), exc)
+            pending = [item]
+        except _SMTP_CONNECTION_ERRORS as exc:
+            # connection-level: every remaining mail would fail the same way
+            logger.warning("Bulk mail: SMTP unavailable, requeueing %d mails via send_mail: %s",
+                           len(items) - i, exc)
+            pending = items[i:]
+            give_up = True
+        except Exception as exc:
+            logger.warning("Bulk mail to %s failed, requeueing via send_mail: %s", item.get("to"), exc)
+            pending = [item]
+        for p in pending:
+            try:
+                send_mail.delay(**p)
+                requeued += 1
+            except Exception:
+                logger.exception("Could not requeue mail to %s", p.get("to"))
+        if give_up:
+            break
+    logger.info("Bulk mail: %d sent, %d requeued of %d", sent, requeued, len(items))
+    return {"status": "ok", "sent": sent, "requeued": requeued, "total": len(items)}
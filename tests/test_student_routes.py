@@ -0,0 +1,80 @@
+# tests/test_student_routes.py
+import os
+
+# eager Celery stand-in: no broker / celery import needed to load the routes
+os.environ.setdefault("FLASK_ENV", "development")
+
+import pytest
+from bson import ObjectId
+
+from app import create_app
+from utils.jwt import create_access_token
+import routes.student_routes as student_routes
+
+COLLEGE_ID = ObjectId()
+STUDENT_ID = ObjectId()
+
+
+class FakeCursor(list):
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+
+class FakeStudents:
+    """Stand-in for the students collection: one matching student."""
+
+    def __init__(self):
+        self.calls = []
+
+    def find(self, *args, **kwargs):
+        self.calls.append(("find", args, kwargs))
+        return FakeCursor([{"_id": STUDENT_ID, "name": "Asha", "email": "asha@example.com"}])
+
+    def count_documents(self, *args, **kwargs):
+        self.calls.append(("count_documents", args, kwargs))
+        return 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = create_app(blueprints=("student_routes",))
+    students = FakeStudents()
+    monkeypatch.setattr(student_routes.Student, "_get_collection", classmethod(lambda cls: students))
+    monkeypatch.setattr(
+        student_routes, "_get_college_min",
+        lambda college_id: student_routes.CollegeRef(COLLEGE_ID, "Test College"),
+    )
+    monkeypatch.setattr(
+        student_routes, "_get_filters_meta",
+        lambda college_oid: {"years": [], "genders": [], "branches": []},
+    )
+    with app.app_context():
+        token = create_access_token({"college_id": str(COLLEGE_ID)})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def test_list_students_streams_rows(client):
+    resp = client.get("/students/list?per_page=10&sort_by=name")
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["success"] is True
+    assert body["college"] == {"id": str(COLLEGE_ID), "name": "Test College"}
+    assert [s["id"] for s in body["students"]] == [str(STUDENT_ID)]
+    assert body["students"][0]["name"] == "Asha"
+    assert body["meta"]["total"] == 1
+    assert body["meta"]["total_pages"] == 1
+    assert body["filters_meta"] == {"years": [], "genders": [], "branches": []}
+
+
+def test_list_students_requires_token(client):
+    resp = client.application.test_client().get("/students/list")
+    assert resp.status_code == 401
@@ -0,0 +1,73 @@
+# utils/cache.py
+import os
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared Redis client (REDIS_URL, else the Celery broker URL), or None when no
+    Redis is configured (e.g. development with eager tasks). redis is imported
+    only once a URL is present.
+    """
+    global _client
+    if _client is None:
+        url = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+        if not url or not url.startswith(("redis://", "rediss://", "unix://")):
+            return None
+        import redis
+        # short timeouts: a slow cache must not be slower than the query it saves
+        _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
+
+
+def cache_get(key):
+    """Cached bytes for `key`, or None on a miss, without Redis, or if Redis is unreachable."""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except Exception:
+        return None
+
+
+def cache_set(key, value, ttl_seconds):
+    """SETEX `key`; failures are ignored (the cache is best-effort)."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.setex(key, ttl_seconds, value)
+    except Exception:
+        pass
+
+
+def cache_delete(key):
+    """Drop `key` so the next reader recomputes it; failures are ignored."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(key)
+    except Exception:
+        pass
+
+
+def cache_incr(key, ttl_seconds):
+    """
+    INCR `key`, starting its TTL on the first increment (a fixed window). Returns the
+    new count, or None without Redis or if Redis is unreachable.
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        # one MULTI: the key is created with its TTL (NX keeps a running window's), then
+        # incremented, so a lost reply can't leave a counter without an expiry
+        pipe = client.pipeline(transaction=True)
+        pipe.set(key, 0, ex=ttl_seconds, nx=True)
+        pipe.incr(key)
+        return pipe.execute()[1]
+    except Exception:
+        return None
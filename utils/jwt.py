@@ -1,8 +1,20 @@
 # utils/jwt.py
 import jwt
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from flask import current_app
 
+# Authorization header scheme; token_required slices it off instead of split()ing
+BEARER_PREFIX = "Bearer "
+BEARER_PREFIX_LEN = len(BEARER_PREFIX)
+
+# HS256 in PyJWT is hmac.new(key, msg, hashlib.sha256), i.e. OpenSSL's SHA-256;
+# the pyjwt[crypto] extra only matters for RS*/ES*/EdDSA keys
+ALGORITHM = "HS256"
+_DECODE_ALGORITHMS = [ALGORITHM]
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1)) -> str:
     """
@@ -12,22 +24,51 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
     secret_key = current_app.config["SECRET_KEY"]
-    algorithm = "HS256"
 
-    return jwt.encode(to_encode, secret_key, algorithm=algorithm)
+    return jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
+
+
+# verified payloads, so a token seen again skips the HS256 check; keyed by a blake2s
+# digest of (secret, token) rather than the token itself
+TOKEN_CACHE_MAX = 4096
+TOKEN_CACHE_TTL_SECONDS = 60
+_token_cache = OrderedDict()  # digest -> (expires_at, payload)
+_token_cache_lock = threading.Lock()
+
+
+def _token_key(token: str, secret_key: str) -> bytes:
+    return hashlib.blake2s(f"{secret_key}\0{token}".encode()).digest()
 
 
 def verify_access_token(token: str) -> dict:
     """
     Verify a JWT token and return decoded data.
+    A token verified in the last minute is served from the cache; its exp is
+    still honoured, so a cached token expires on time.
     """
     secret_key = current_app.config["SECRET_KEY"]
-    algorithm = "HS256"
+    key = _token_key(token, secret_key)
+    now = time.time()
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _token_cache.move_to_end(key)
+                return dict(hit[1])
+            del _token_cache[key]
     try:
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
-        return payload
+        payload = jwt.decode(token, secret_key, algorithms=_DECODE_ALGORITHMS)
     except jwt.ExpiredSignatureError:
         raise ValueError("Token has expired")
     except jwt.InvalidTokenError:
         raise ValueError("Invalid token")
- 
\ No newline at end of file
+
+    expires_at = now + TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp is not None:
+        expires_at = min(expires_at, exp)
+    with _token_cache_lock:
+        _token_cache[key] = (expires_at, payload)
+        if len(_token_cache) > TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+    return dict(payload)
@@ -0,0 +1,28 @@
+# utils/mongo.py
+from contextlib import ExitStack
+from functools import wraps
+
+from mongoengine.context_managers import no_dereference
+
+
+def no_deref(*models):
+    """
+    Decorator: run the view with automatic dereferencing disabled for `models`.
+    Reference fields then yield DBRefs/ids (use `.id`) instead of fetching
+    each referenced document.
+
+    Usage:
+        @no_deref(Test)
+        def get_test(test_id): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            with ExitStack() as stack:
+                for model in models:
+                    stack.enter_context(no_dereference(model))
+                return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
@@ -0,0 +1,52 @@
+# utils/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from mongoengine.queryset.visitor import Q
+
+
+def encode_cursor(doc, sort_by: str, sort_dir: str) -> str:
+    """
+    Opaque list cursor: the last row's id and sort value, plus the ordering it belongs to.
+    `doc` is a Document or a raw dict (as_pymongo()).
+    """
+    if isinstance(doc, dict):
+        doc_id, sort_value = doc["_id"], doc.get("_id" if sort_by == "id" else sort_by)
+    else:
+        doc_id, sort_value = doc.id, getattr(doc, sort_by)
+    if sort_by == "id":
+        sort_value = None
+    data = {"id": str(doc_id), "sb": sort_by, "sd": sort_dir, "sv": sort_value}
+    if isinstance(sort_value, datetime):
+        data["sv"], data["t"] = sort_value.isoformat(), "dt"
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_dir: str):
+    """(last id, last sort value) from a cursor; ValueError if it is malformed or from another ordering."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        last_id = ObjectId(data["id"])
+        sort_value = data.get("sv")
+        if data.get("t") == "dt":
+            sort_value = datetime.fromisoformat(sort_value)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if data.get("sb") != sort_by or data.get("sd") != sort_dir:
+        raise ValueError("Cursor does not match the requested sort")
+    return last_id, sort_value
+
+
+def after_cursor(sort_by: str, descending: bool, last_id, sort_value) -> Q:
+    """Rows strictly after (sort_value, last_id) in (sort_by, id) order: an index range, not a skip."""
+    op = "lt" if descending else "gt"
+    after_id = Q(**{f"id__{op}": last_id})
+    if sort_by == "id":
+        return after_id
+    same_value = Q(**{sort_by: sort_value}) & after_id
+    if sort_value is None:
+        # nulls sort lowest and cannot be range-compared: ascending, every non-null comes next
+        return same_value if descending else (Q(**{f"{sort_by}__ne": None}) | same_value)
+    return Q(**{f"{sort_by}__{op}": sort_value}) | same_value
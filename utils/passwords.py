@@ -0,0 +1,11 @@
+# utils/passwords.py
+from werkzeug.security import generate_password_hash
+
+# scrypt verifies faster than werkzeug's pbkdf2:sha256 default at comparable strength.
+# check_password_hash reads the method from the stored hash, so existing pbkdf2 hashes keep working.
+PASSWORD_HASH_METHOD = "scrypt"
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with the app-wide KDF (PASSWORD_HASH_METHOD)."""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
@@ -1,10 +1,61 @@
 # utils/response.py
-from flask import jsonify
+import orjson
+from flask import current_app
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+
+# response() keeps jsonify's wire format: datetimes go to the app's JSON provider
+# (RFC 822 dates, str() for Decimal and the like) instead of orjson's ISO 8601
+RESPONSE_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
 
 
 def response(success: bool, message: str, data=None):
-    return jsonify({
-        "success": success,
-        "message": message,
-        "data": data
-    })
+    """The {success, message, data} envelope, encoded by orjson like jsonify() would."""
+    provider = current_app.json
+    option = RESPONSE_OPTIONS | (orjson.OPT_SORT_KEYS if getattr(provider, "sort_keys", False) else 0)
+    return current_app.response_class(
+        orjson.dumps({
+            "success": success,
+            "message": message,
+            "data": data
+        }, default=provider.default, option=option),
+        mimetype="application/json",
+    )
+
+
+def json_response(payload):
+    """jsonify() for large payloads: serialized by orjson (C) instead of the stdlib encoder."""
+    return current_app.response_class(orjson.dumps(payload, option=ORJSON_OPTIONS), mimetype="application/json")
+
+
+def _stream_frame(payload, path):
+    """(bytes before the streamed list, the list's iterable, bytes after it) for a key path."""
+    key, rest = path[0], path[1:]
+    keys = list(payload)
+    pos = keys.index(key)
+    head = orjson.dumps({k: payload[k] for k in keys[:pos]}, option=ORJSON_OPTIONS)
+    tail = orjson.dumps({k: payload[k] for k in keys[pos + 1:]}, option=ORJSON_OPTIONS)
+    opening = head[:-1] + (b"," if pos else b"") + orjson.dumps(key) + b":"
+    closing = b"," + tail[1:] if len(tail) > 2 else b"}"
+    if rest:
+        inner_opening, items, inner_closing = _stream_frame(payload[key], rest)
+        return opening + inner_opening, items, inner_closing + closing
+    return opening + b"[", payload[key], b"]" + closing
+
+
+def json_stream_response(payload, stream_key):
+    """
+    json_response() that streams payload[stream_key], an iterable, one encoded item
+    at a time, so the list is never held whole in memory or as one encoded body.
+    stream_key may be a dotted path into nested dicts (e.g. "data.items"). The other
+    keys are encoded up front and keep their order around the list.
+    """
+    opening, items, closing = _stream_frame(payload, stream_key.split("."))
+
+    def generate():
+        yield opening
+        for i, item in enumerate(items):
+            yield (b"," if i else b"") + orjson.dumps(item, option=ORJSON_OPTIONS)
+        yield closing
+
+    return current_app.response_class(generate(), mimetype="application/json")